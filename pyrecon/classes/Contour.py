@@ -1,7 +1,20 @@
-from shapely.geometry import Polygon, LineString, box, LinearRing
-import math
+from shapely.geometry import Polygon, LineString, box
+from PointStore import pathLengths, signedAreas
+import numpy as np
 
-class Contour:
+class Contour(object):
+    # Attribute tables (instances have no __dict__; see __slots__)
+    _attributes = ('name','comment','hidden','closed','simplified','mode','border','fill','points')
+    _nonAttributes = ('coordSys','image','transform','shape','section')
+    _fields = _attributes+_nonAttributes
+    # points, transform and shape are properties: geometry derived from them is cached until they change
+    # name is a property that counts renames (see Contour.renames)
+    __slots__ = ('_name','comment','hidden','closed','simplified','mode','border','fill','_points',
+                 'coordSys','image','_transform','_shape','section',
+                 '_world','_bounds','_cacheTform','_cacheMag') # Cache (see checkCache)
+    # Fields compared by __eq__, cheapest first; points are compared last with self.pointsEqual()
+    _eqFields = ('name','closed','simplified','mode','section','coordSys','border','fill','transform','image')
+    renames = 0 # Number of times a named Contour was given another name (see Series.nameIndex)
     def __init__(self, *args, **kwargs):
         self.name = None
         self.comment = None
@@ -21,7 +34,7 @@ class Contour:
         self.processArguments(args, kwargs)
 
     def __hash__(self):
-        return hash(tuple(self.points))
+        return hash(tuple(map(tuple, self.pointsList())))
 
     def processArguments(self, args, kwargs):
         # 1) ARGS
@@ -43,8 +56,8 @@ class Contour:
             if type(arg) == type({}):
                 for key in arg:
                     # Dict:attributes
-                    if key in self.__dict__:
-                        self.__dict__[key] = arg[key]
+                    if key in self._fields:
+                        setattr(self, key, arg[key])
             # Transform
             elif arg.__class__.__name__ == 'Transform':
                 self.transform = arg
@@ -53,19 +66,105 @@ class Contour:
                 self.image = arg
 # ACCESSORS
     def __eq__(self, other):
-        '''Allows use of == between multiple contours.'''
-        comparisonDict1 = {}
-        for key in self.__dict__:
-            if key not in ['shape','comment','hidden']:
-                comparisonDict1[key] = self.__dict__[key]
-        comparisonDict2 = {}
-        for key in other.__dict__:
-            if key not in ['shape','comment','hidden']:
-                comparisonDict2[key] = other.__dict__[key]
-        return (comparisonDict1 == comparisonDict2)
+        '''Allows use of == between multiple contours. Compares every field but shape, comment and hidden.'''
+        for key in self._eqFields:
+            if getattr(self, key) != getattr(other, key):
+                return False
+        return self.pointsEqual(other)
     def __ne__(self, other):
         '''Allows use of != between multiple contours.'''
         return not self.__eq__(other)
+    def __getstate__(self):
+        '''Returns a dict of all fields (for pickle/copy, as instances have no __dict__).'''
+        return dict((key, getattr(self, key)) for key in self._fields)
+    def __setstate__(self, state):
+        self.clearCache()
+        for key in self._fields: # shape after the fields its cache depends on
+            setattr(self, key, state.get(key))
+    def pointsEqual(self, other):
+        '''Returns true if self.points and other.points hold the same points (either may be a list or numpy array).'''
+        if isinstance(self.points, np.ndarray) or isinstance(other.points, np.ndarray):
+            if self.points is None or other.points is None:
+                return self.points is other.points
+            return np.array_equal(np.asarray(self.points), np.asarray(other.points))
+        return self.points == other.points
+    def pointsArray(self):
+        '''Returns self.points as an (N, 2) numpy array (without copying if it already is one).'''
+        return np.asarray(self.points, dtype=np.float64).reshape((-1, 2))
+    def pointsList(self):
+        '''Returns self.points as a list of (x, y) tuples.'''
+        if isinstance(self.points, np.ndarray):
+            return map(tuple, self.points.tolist())
+        return self.points
+    @property
+    def name(self):
+        return self._name
+    @name.setter
+    def name(self, name):
+        if getattr(self, '_name', None) is not None and name != self._name:
+            Contour.renames += 1
+        self._name = name
+# Cached geometry
+    @property
+    def points(self):
+        return self._points
+    @points.setter
+    def points(self, points):
+        self._points = points
+        self.clearCache()
+    @property
+    def transform(self):
+        return self._transform
+    @transform.setter
+    def transform(self, transform):
+        self._transform = transform
+        self.clearCache()
+    @property
+    def shape(self):
+        '''Shapely geometry made by popShape(); None if not made yet or if points/transform changed since.'''
+        self.checkCache()
+        return self._shape
+    @shape.setter
+    def shape(self, shape):
+        self.checkCache()
+        self._shape = shape
+    def clearCache(self):
+        '''Drops cached world points, bounds and shape. Called when points or transform are set; call it after
+        changing points in place.'''
+        self._world = None
+        self._bounds = None
+        self._shape = None
+        self._cacheTform = None
+        self._cacheMag = None
+    def checkCache(self):
+        '''Clears the cache if the transform was rebuilt (new Transform._tform) or the image mag changed since it was
+        filled.'''
+        tform = getattr(self._transform, '_tform', None)
+        mag = self.magnification()
+        if tform is not self._cacheTform or mag != self._cacheMag:
+            self.clearCache()
+            self._cacheTform = tform
+            self._cacheMag = mag
+    def magnification(self):
+        '''Returns the factor points are multiplied by before inverting the transform: the image mag for closed image
+        contours (domain1), 1 otherwise.'''
+        if self.closed == True and self.image.__class__.__name__ == 'Image':
+            return self.image.mag
+        return 1
+    def worldPoints(self):
+        '''Returns (read-only, cached) (N, 2) array of the points in world coordinates, as used for self.shape.'''
+        self.checkCache()
+        if self._world is None:
+            self._world = self.transform._tform.inverse(self.pointsArray()*self.magnification())
+            self._world.flags.writeable = False
+        return self._world
+    def bounds(self):
+        '''Returns (cached) (minx, miny, maxx, maxy) of the points in world coordinates.'''
+        self.checkCache()
+        if self._bounds is None:
+            world = self.worldPoints()
+            self._bounds = tuple(world.min(axis=0).tolist()+world.max(axis=0).tolist())
+        return self._bounds
 # transform/shape operations
     def convertToBioCoords(self, mag):
         '''converts points to biological coordinate system and performs appropraite updates to shape.'''
@@ -82,23 +181,18 @@ class Contour:
         self.coordSys = 'pix'
         self.popShape() # repopulate shape
     def popShape(self):
-        '''Adds polygon object (shapely) to self._shape'''
+        '''Adds polygon object (shapely) to self.shape, unless it is already there (see checkCache)'''
+        if self.shape is not None:
+            return
         # Closed trace
         if self.closed == True:
-            # If image contour, multiply pts by mag before inverting transform
-            if self.image.__class__.__name__ == 'Image':
-                mag = self.image.mag
-                xvals = [pt[0]*mag for pt in self.points]
-                yvals = [pt[1]*mag for pt in self.points]
-                pts = zip(xvals,yvals)
-            else:
-                if len(self.points) < 3:
-                    return None
-                pts = self.points
-            self.shape = Polygon( self.transform.worldpts(pts) ) #===
+            # If image contour, pts are multiplied by mag before inverting transform (see magnification)
+            if self.image.__class__.__name__ != 'Image' and len(self.points) < 3:
+                return None
+            self.shape = Polygon( self.worldPoints() ) #===
         # Open trace
         elif self.closed == False and len(self.points)>1:
-            self.shape = LineString( self.transform.worldpts(self.points) ) #===
+            self.shape = LineString( self.worldPoints() ) #===
         else:
             print('\nInvalid shape characteristics: '+self.name)
             print('Quit for debug')
@@ -106,25 +200,29 @@ class Contour:
     def box(self):
         '''Returns bounding box of shape (shapely) library'''
         if self.shape != None:
-            minx, miny, maxx, maxy = self.shape.bounds
+            minx, miny, maxx, maxy = self.bounds()
             return box(minx, miny, maxx, maxy)
         #else:
         #    print('NoneType for shape: '+self.name)
 # mergeTool functions
+    def geometryKey(self):
+        '''Returns a hashable key of name, closed flag, transform, image mag and exact points. Contours with equal
+        keys have identical world coordinates.'''
+        return (self.name, self.closed, self.transform.key() if self.transform is not None else None,
+                self.magnification(), self.pointsArray().tobytes())
     def overlaps(self, other, threshold=(1+2**(-17))):
         '''Return 0 if no overlap.
         For closed traces: return 1 if AoU/AoI < threshold, return AoU/AoI if not < threshold
         For open traces: return 0 if # pts differs or distance between parallel pts > threshold
                          return 1 otherwise'''
-        if self.shape == None:self.popShape()
-        if other.shape == None:other.popShape()
-        # Check bounding box (reduces comp. time for non-overlapping contours)
-
-        if (self.box() is None or other.box() is None):
+        self.popShape()
+        other.popShape()
+        if self.shape is None or other.shape is None:
             return 0
-
-        if (not self.box().intersects(other.box()) and
-            not self.box().touches(other.box()) ):
+        # Check bounding box (reduces comp. time for non-overlapping contours)
+        minx, miny, maxx, maxy = self.bounds()
+        ominx, ominy, omaxx, omaxy = other.bounds()
+        if minx > omaxx or ominx > maxx or miny > omaxy or ominy > maxy: # boxes neither intersect nor touch
             return 0
         # Check if both same type of contour
         if self.closed != other.closed:
@@ -143,29 +241,23 @@ class Contour:
         if not self.closed:
             if len( self.points ) != len( other.points ):
                 return 0
-            def distance(pt0, pt1):
-                return math.sqrt( (pt0[0] - pt1[0])**2 + (pt0[1] - pt1[1])**2 )
-            # Lists of world coords to compare
-            a = self.transform.worldpts(self.points)
-            b = other.transform.worldpts(other.points)
-            distlist = [distance(a[i],b[i]) for i in range(len(self.points))] 
-            for elem in distlist:
-                if elem > threshold:
-                    return 0
+            # Arrays of world coords to compare
+            a = self.worldPoints()
+            b = other.worldPoints()
+            distances = np.sqrt( ((a-b)**2).sum(axis=1) )
+            if (distances > threshold).any():
+                return 0
         return 1
 # curationTool functions
     def getLength(self):
-        '''Returns the sum of all line segments in the contour object'''
-        length = 0
-        for index in range( len(self.points) ):
-            if index+1 >= len(self.points): # stop when outside index range
-                break
-            pt = self.points[index]
-            nextPt = self.points[index+1]
-            length += (((nextPt[0]-pt[0])**2)+((nextPt[1]-pt[1])**2))**(0.5)
-        if self.closed: # If closed object, add distance between 1st and last pt too
-            length += (((self.points[0][0]-self.points[-1][0])**2)+((self.points[0][1]-self.points[-1][1])**2))**(0.5)
-        return length #=== sqrt is taxing computation; reimplement with 1 sqrt at end?
+        '''Returns the sum of all line segments in the contour object (between 1st and last pt too if closed), in
+        the coordinates of self.points'''
+        return float(pathLengths(self.pointsArray(), np.array([0, len(self.points)]), [self.closed])[0])
+    def getArea(self):
+        '''Returns the area of the contour in world coordinates (as self.shape.area), 0 if it is open'''
+        if not self.closed:
+            return 0.0
+        return abs(float(signedAreas(self.worldPoints(), np.array([0, len(self.points)]))[0]))
     def getStartEndCount(self, series):
         '''Returns the start, end, and count values for this contour in given series. Determined by self.name only'''
         return series.getStartEndCount(self.name)
@@ -177,10 +269,9 @@ class Contour:
         return series.getFlatArea(self.name)
     def isReverse(self):
         '''Returns true if contour is a reverse trace (negative area)'''
-        self.popShape()
+        self.popShape() # (reused if cached)
         if self.closed:
-            ring = LinearRing(self.shape.exterior.coords) # convert polygon to ring
-            return not ring.is_ccw # For some reason, the opposite is true (image vs biological coordinate system?)
+            return not self.shape.exterior.is_ccw # For some reason, the opposite is true (image vs biological coordinate system?)
         else:
             return False
     def isInvalid(self):
@@ -1,4 +1,5 @@
-class Image:
+class Image(object):
+    __slots__ = ('src','mag','contrast','brightness','red','green','blue','transform','_path') # No instance __dict__
     def __init__(self, *args, **kwargs):
         self.src = None
         self.mag = None
@@ -32,8 +33,8 @@ class Image:
             if type(arg) == type({}):
                 for key in arg:
                     # Dict:Attribute
-                    if key in self.__dict__:
-                        self.__dict__[key] = arg[key]
+                    if key in self.__slots__:
+                        setattr(self, key, arg[key])
                     # Dict:Transform
                     elif arg[key].__class__.__name__ == 'Transform':
                         self.transform = arg[key]
@@ -48,6 +49,11 @@ class Image:
                 self.contrast == other.contrast)
     def __ne__(self, other):
         return not self.__eq__(other)
+    def __getstate__(self):
+        return dict((key, getattr(self, key)) for key in self.__slots__)
+    def __setstate__(self, state):
+        for key in state:
+            setattr(self, key, state[key])
     def attributes(self):
         return {'src':self.src,
                 'mag':self.mag,
@@ -4,9 +4,10 @@ from pyrecon.main import openSeries
 
 class MultiSectionContour:
     '''Object with data representing a Contour that spans multiple sections. Example data includes: start, end, count, surface area, flat area, volume, etc. and depends on the type of object loaded into MultiSectionContour.'''
-    def __init__(self, name=None, series=None):
+    def __init__(self, name=None, series=None, table=None):
         self.name = None # Name of object
         self.series = None # Series to which this object belongs
+        self.table = table # Series.measurementTable() to read data from (None: measure from self.series)
         
         self.start = None
         self.end = None
@@ -24,11 +25,21 @@ class MultiSectionContour:
         self.dendrite = self.getDendNumber() # Parent dendrite number (stored as 'd##')
         self.rType = self.getrType()
         self.data = {} # updated in makeSpecific
-        SEC = self.series.getStartEndCount(self.name)
+        row = self.tableRow()
+        if row is not None:
+            SEC = [self.table[item][row].item() for item in ('start', 'end', 'count')]
+        else:
+            SEC = self.series.getStartEndCount(self.name)
         self.start = SEC[0]
         self.end = SEC[1]
         self.count = SEC[2]
 
+    def tableRow(self):
+        '''Returns the row of this object in self.table (None if there is no table or no contour of this name)'''
+        if self.table is None:
+            return None
+        return self.table['row'].get(self.name)
+
     def getDendNumber(self):
         dend = re.compile('d[0-9]{1,}')
         try:
@@ -73,8 +84,12 @@ class MultiSectionContour:
     
     def getData(self, list_of_desired_data=None):
         data = OrderedDict()
+        row = self.tableRow()
         for item in list_of_desired_data:
-            data[item] = self.series.getData(self.name, item)
+            if row is not None and item in self.table:
+                data[item] = self.table[item][row].item()
+            else:
+                data[item] = self.series.getData(self.name, item)
         self.data = data
         self.numColumns = len(list_of_desired_data)
              
@@ -92,7 +107,7 @@ class MultiSectionContour:
         children = {}
         child_exp = re.compile(self.dendrite+'.{0,}'+self.protrusion[1:]) # dont include 'p' in self.protrusion
         dend_exp = re.compile(self.dendrite)
-        for child in self.series.getObjectLists()[2]:
+        for child in self.series.getObjectLists(self.table['name'] if self.table is not None else None)[2]:
             if child_exp.match(child) != None:
                 # Extract from name what is in between dend and prot
                 endOfDendrite = dend_exp.match(child).end()
@@ -112,43 +127,43 @@ class MultiSectionContour:
             return 0
 
 class Dendrite(MultiSectionContour):
-    def __init__(self, name=None, series=None):
-        MultiSectionContour.__init__(self, name, series)
+    def __init__(self, name=None, series=None, table=None):
+        MultiSectionContour.__init__(self, name, series, table)
         data = {}
     def loadData(self):
         return
         
 class Axon(MultiSectionContour):
-    def __init__(self, name=None, series=None):
-        MultiSectionContour.__init__(self, name, series)
+    def __init__(self, name=None, series=None, table=None):
+        MultiSectionContour.__init__(self, name, series, table)
         data = {}
     def loadData(self):
         return
 
 class Spine(MultiSectionContour):
-    def __init__(self, name=None, series=None):
-        MultiSectionContour.__init__(self, name, series)
+    def __init__(self, name=None, series=None, table=None):
+        MultiSectionContour.__init__(self, name, series, table)
         data = {}
     def loadData(self):
         return
 
 class SER(MultiSectionContour):
-    def __init__(self, name=None, series=None):
-        MultiSectionContour.__init__(self, name, series)
+    def __init__(self, name=None, series=None, table=None):
+        MultiSectionContour.__init__(self, name, series, table)
         data = {}
     def loadData(self):
         return
 
 class CFA(MultiSectionContour):
-    def __init__(self, name=None, series=None):
-        MultiSectionContour.__init__(self, name, series)
+    def __init__(self, name=None, series=None, table=None):
+        MultiSectionContour.__init__(self, name, series, table)
         data = {}
     def loadData(self):
         return
 
 class C(MultiSectionContour):
-    def __init__(self, name=None, series=None):
-        MultiSectionContour.__init__(self, name, series)
+    def __init__(self, name=None, series=None, table=None):
+        MultiSectionContour.__init__(self, name, series, table)
         data = {}
     def loadData(self):
         return
\ No newline at end of file
@@ -0,0 +1,98 @@
+from Contour import Contour
+import bisect, re
+
+def sectionStamp(section):
+    '''Returns (id(<section>), version of its contours) (see Section.ContourList), which changes when its contours
+    do. For a SectionProxy whose Section is not loaded, the version is None: its contours are re-read from its file.'''
+    if section.__class__.__name__ == 'SectionProxy':
+        if not section.isLoaded():
+            return (id(section), None)
+        return (id(section), section.section().contours.version)
+    return (id(section), section.contours.version)
+
+class NameIndex:
+    '''Index of the contour names of a list of Sections: name -> (section position, contour position) occurrences in
+    order, and the sorted unique names for prefix and regex lookups. It holds no Sections or Contours: positions are
+    resolved through the indexed list, and sectionStamp tells which sections changed since they were indexed. Series
+    keeps one up to date (see Series.nameIndex).'''
+    def __init__(self, sections=None):
+        self.occurrences = {} # name -> sorted [(section position, contour position)]
+        self.names = [] # Sorted unique names
+        self.sectionNames = [] # Names indexed for each section position
+        self.stamps = [] # sectionStamp of each section position when it was indexed
+        self.renames = Contour.renames # Contours renamed before the index was built
+        for section in sections or []:
+            self.add(section)
+# MUTATORS
+    def add(self, section):
+        '''Indexes the contours of <section>, which comes after the sections already indexed.'''
+        self.sectionNames.append(set())
+        self.stamps.append(None)
+        self.insert(len(self.stamps)-1, section)
+    def update(self, sections):
+        '''Re-indexes the sections of <sections> (the list that was indexed) whose contours changed since. Returns
+        False if the index cannot be updated and must be rebuilt: the number of sections changed or a Contour was
+        renamed (see Contour.renames).'''
+        if len(sections) != len(self.stamps) or self.renames != Contour.renames:
+            return False
+        for position, section in enumerate(sections):
+            stamp = sectionStamp(section)
+            indexed = self.stamps[position]
+            if indexed is None or stamp[0] != indexed[0] or (stamp[1] is not None and stamp[1] != indexed[1]):
+                self.refresh(position, section)
+        return True
+    def refresh(self, position, section):
+        '''Re-indexes the contours of <section>, at <position>, after they changed.'''
+        self.clear(position)
+        self.insert(position, section)
+    def insert(self, position, section):
+        '''Adds the occurrences in <section>, at <position>, keeping each name's occurrences in order.'''
+        names = set()
+        for i, contour in enumerate(section.contours):
+            if contour.name not in self.occurrences:
+                self.occurrences[contour.name] = []
+                bisect.insort(self.names, contour.name)
+            occurrences = self.occurrences[contour.name]
+            if occurrences and occurrences[-1] > (position, i): # Goes before sections indexed later
+                bisect.insort(occurrences, (position, i))
+            else:
+                occurrences.append((position, i))
+            names.add(contour.name)
+        self.sectionNames[position] = names
+        self.stamps[position] = sectionStamp(section)
+    def clear(self, position):
+        '''Removes the occurrences in the section at <position>.'''
+        for name in self.sectionNames[position]:
+            occurrences = self.occurrences[name]
+            del occurrences[bisect.bisect_left(occurrences, (position,)):bisect.bisect_left(occurrences, (position+1,))]
+            if not occurrences:
+                del self.occurrences[name]
+                del self.names[bisect.bisect_left(self.names, name)]
+        self.sectionNames[position] = set()
+        self.stamps[position] = None
+# ACCESSORS
+    def __contains__(self, name):
+        return name in self.occurrences
+    def __len__(self):
+        '''Number of unique names'''
+        return len(self.names)
+    def lookup(self, name):
+        '''Returns the (section position, contour position) occurrences of <name>, in order.'''
+        return list(self.occurrences.get(name, []))
+    def positions(self, name):
+        '''Returns the positions of the sections containing <name>, in order (each once).'''
+        positions = []
+        for position, i in self.occurrences.get(name, []):
+            if not positions or positions[-1] != position:
+                positions.append(position)
+        return positions
+    def prefix(self, prefix):
+        '''Returns the sorted names starting with <prefix>.'''
+        start = bisect.bisect_left(self.names, prefix)
+        end = start
+        while end < len(self.names) and self.names[end].startswith(prefix):
+            end += 1
+        return self.names[start:end]
+    def match(self, regex):
+        '''Returns the sorted names that <regex> matches (re.match) at their start.'''
+        return [name for name in self.names if re.match(regex, name)]
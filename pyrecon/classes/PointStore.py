@@ -0,0 +1,176 @@
+import numpy as np
+import tempfile
+
+# Measurement kernels: contours are given as (M, 2) <points> with (C+1,) <offsets>, contour c being
+# points[offsets[c]:offsets[c+1]] (as in PointStore)
+def packPoints(arrays):
+    '''Returns (points, offsets) of the (N, 2) point <arrays> concatenated.'''
+    offsets = np.concatenate(([0], np.cumsum([len(a) for a in arrays]))).astype(np.int64)
+    if offsets[-1] == 0:
+        return np.zeros((0, 2), dtype=np.float64), offsets
+    return np.concatenate([np.asarray(a, dtype=np.float64).reshape((-1, 2)) for a in arrays]), offsets
+def signedAreas(points, offsets):
+    '''Returns the signed shoelace area of each contour as a closed ring (positive if counter-clockwise), 0 for
+    contours with less than 3 points. Points are taken relative to the ring's first point (as GEOS does).'''
+    counts = np.diff(offsets)
+    areas = np.zeros(len(counts), dtype=np.float64)
+    valid = counts > 0
+    if not valid.any():
+        return areas
+    starts = offsets[:-1][valid]
+    rel = points - np.repeat(points[starts], counts[valid], axis=0)
+    nxt = np.zeros(rel.shape, dtype=np.float64)
+    nxt[:-1] = rel[1:]
+    nxt[offsets[1:][valid]-1] = 0 # Last point -> first point, the origin
+    areas[valid] = np.add.reduceat(rel[:,0]*nxt[:,1] - nxt[:,0]*rel[:,1], starts)/2.0
+    areas[counts < 3] = 0
+    return areas
+def pathLengths(points, offsets, closed):
+    '''Returns the length of each contour, the closing segment (last point -> first point) included where <closed>
+    (boolean per contour).'''
+    counts = np.diff(offsets)
+    lengths = np.zeros(len(counts), dtype=np.float64)
+    valid = counts > 0
+    if not valid.any():
+        return lengths
+    starts, last = offsets[:-1][valid], offsets[1:][valid]-1
+    seg = np.zeros(len(points), dtype=np.float64)
+    seg[:-1] = np.sqrt(((points[1:]-points[:-1])**2).sum(axis=1))
+    seg[last] = 0 # No segment from a contour's last point to the next contour
+    closing = np.asarray(closed, dtype=bool)[valid]
+    seg[last[closing]] = np.sqrt(((points[last[closing]]-points[starts[closing]])**2).sum(axis=1))
+    lengths[valid] = np.add.reduceat(seg, starts)
+    return lengths
+
+class PointStore:
+    '''Columnar store of the Contour points of a whole Series: one memory-mapped (M, 2) float64 point buffer plus
+    per-contour offset, name-id, section-id, transform-id and flag arrays. Contours of the Series become views into
+    the buffer, and whole-series measurements (areas, lengths, bounds, world points) are numpy reductions over it.'''
+    CLOSED = 1
+    HIDDEN = 2
+    SIMPLIFIED = 4
+    def __init__(self, series=None, path=None, views=True):
+        self.path = path # File backing self.points (None: temporary file)
+        self.points = None # np.memmap (M, 2) float64
+        self.offsets = None # (C+1,) int64: points of contour c are self.points[offsets[c]:offsets[c+1]]
+        self.nameIds = None # (C,) int32 index into self.names
+        self.sectionIds = None # (C,) int32 position in Series.sections
+        self.transformIds = None # (C,) int32 index into self.transforms
+        self.flags = None # (C,) uint8 of CLOSED | HIDDEN | SIMPLIFIED
+        self.mags = None # (C,) float64: image mag for closed image contours (see Contour.popShape), else 1
+        self.names = [] # Unique contour names
+        self.sectionIndices = [] # Section.index of each Series.sections position
+        self.transforms = [] # Unique Transform objects
+        self.contours = [] # Contour objects, in store order
+        if series is not None:
+            self.load(series, views)
+    def load(self, series, views=True):
+        '''Fills the store from the Contours in <series>.sections. If <views>, each Contour's points are replaced by
+        its view into self.points.'''
+        nameIds = {}
+        transformIds = {}
+        contours = []
+        sectionIds = []
+        for i, section in enumerate(series.sections):
+            self.sectionIndices.append(section.index)
+            for contour in section.contours:
+                contours.append(contour)
+                sectionIds.append(i)
+        self.contours = contours
+        counts = np.array([len(contour.points) for contour in contours], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        # Point buffer
+        if self.path is None:
+            backing = tempfile.TemporaryFile()
+        else:
+            backing = self.path
+        self.points = np.memmap(backing, dtype=np.float64, mode='w+', shape=(max(int(self.offsets[-1]), 1), 2))
+        for c, contour in enumerate(contours):
+            if counts[c]:
+                self.points[self.offsets[c]:self.offsets[c+1]] = contour.pointsArray()
+        self.points.flush()
+        if self.offsets[-1] == 0: # np.memmap cannot be empty
+            self.points = self.points[:0]
+        # Per-contour columns
+        self.nameIds = np.empty(len(contours), dtype=np.int32)
+        self.transformIds = np.empty(len(contours), dtype=np.int32)
+        self.flags = np.zeros(len(contours), dtype=np.uint8)
+        self.mags = np.ones(len(contours), dtype=np.float64)
+        for c, contour in enumerate(contours):
+            if contour.name not in nameIds:
+                nameIds[contour.name] = len(self.names)
+                self.names.append(contour.name)
+            self.nameIds[c] = nameIds[contour.name]
+            if id(contour.transform) not in transformIds:
+                transformIds[id(contour.transform)] = len(self.transforms)
+                self.transforms.append(contour.transform)
+            self.transformIds[c] = transformIds[id(contour.transform)]
+            self.flags[c] = ((self.CLOSED if contour.closed else 0) |
+                             (self.HIDDEN if contour.hidden else 0) |
+                             (self.SIMPLIFIED if contour.simplified else 0))
+            if contour.closed and contour.image.__class__.__name__ == 'Image':
+                self.mags[c] = contour.image.mag
+        self.sectionIds = np.array(sectionIds, dtype=np.int32)
+        if views:
+            for c, contour in enumerate(contours):
+                contour.points = self.points[self.offsets[c]:self.offsets[c+1]]
+# ACCESSORS
+    def __len__(self):
+        '''Number of contours in the store.'''
+        return len(self.contours)
+    def counts(self):
+        '''Returns number of points in each contour.'''
+        return np.diff(self.offsets)
+    def closed(self):
+        '''Returns boolean array: is each contour closed?'''
+        return (self.flags & self.CLOSED) != 0
+    def contourOfPoints(self):
+        '''Returns the contour number of each point in self.points.'''
+        return np.repeat(np.arange(len(self.contours)), self.counts())
+    def worldPoints(self):
+        '''Returns an (M, 2) array of every point in world coordinates (as Transform.worldpts/Contour.popShape).'''
+        world = np.empty(self.points.shape, dtype=np.float64)
+        pointTransforms = np.repeat(self.transformIds, self.counts())
+        pointMags = np.repeat(self.mags, self.counts())
+        for t, transform in enumerate(self.transforms):
+            mask = (pointTransforms == t)
+            if mask.any():
+                world[mask] = transform._tform.inverse(self.points[mask]*pointMags[mask][:,None])
+        return world
+    def reduce(self, ufunc, values):
+        '''Returns ufunc.reduceat of per-point <values> over each contour (0 for contours without points).'''
+        valid = self.counts() > 0
+        result = np.zeros(len(self.contours), dtype=np.float64)
+        if valid.any():
+            result[valid] = ufunc.reduceat(values, self.offsets[:-1][valid])
+        return result
+    def lengths(self, world=False):
+        '''Returns the length of each contour (the closing segment included for closed contours), in local
+        coordinates as Contour.getLength, or in world coordinates if <world>.'''
+        pts = self.worldPoints() if world else np.asarray(self.points)
+        return pathLengths(pts, self.offsets, self.closed())
+    def areas(self, world=True):
+        '''Returns the (unsigned, shoelace) area of each closed contour in world coordinates, or local coordinates if
+        not <world>. Open contours have area 0.'''
+        return np.abs(self.signedAreas(world))
+    def signedAreas(self, world=True):
+        '''Returns the signed shoelace area of each closed contour (positive if counter-clockwise). Open contours and
+        contours with less than 3 points have area 0.'''
+        pts = self.worldPoints() if world else np.asarray(self.points)
+        areas = signedAreas(pts, self.offsets)
+        areas[~self.closed()] = 0
+        return areas
+    def bounds(self, world=True):
+        '''Returns a (C, 4) array of (minx, miny, maxx, maxy) for each contour (nan for contours without points).'''
+        pts = self.worldPoints() if world else np.asarray(self.points)
+        bounds = np.empty((len(self.contours), 4), dtype=np.float64)
+        bounds[:,0] = self.reduce(np.minimum, pts[:,0])
+        bounds[:,1] = self.reduce(np.minimum, pts[:,1])
+        bounds[:,2] = self.reduce(np.maximum, pts[:,0])
+        bounds[:,3] = self.reduce(np.maximum, pts[:,1])
+        bounds[self.counts() == 0] = np.nan
+        return bounds
+    def byName(self, values):
+        '''Returns a dict of name -> sum of per-contour <values> over the contours with that name.'''
+        sums = np.bincount(self.nameIds, weights=values, minlength=len(self.names))
+        return dict(zip(self.names, sums.tolist()))
@@ -1,6 +1,40 @@
 # handleXML is imported in .update()
-import os
-class Section:
+from PointStore import packPoints, pathLengths, signedAreas
+import numpy as np
+import hashlib, os
+def _mutator(method):
+	'''Wraps a list method of ContourList so that it counts as a change.'''
+	def mutate(self, *args):
+		self.touch()
+		return method(self, *args)
+	mutate.__name__ = method.__name__
+	return mutate
+class ContourList(list):
+	'''List of the Contours of a Section. self.version changes each time the list is changed, so that indices of its
+	contours (e.g. Series.nameIndex) can tell when they are out of date. Versions are not reused by other lists.'''
+	changes = 0 # Number of ContourLists made or changed in this process
+	def __init__(self, contours=()):
+		list.__init__(self, contours)
+		self.touch()
+	def __reduce__(self):
+		return (ContourList, (list(self),)) # Unpickled lists get a new version
+	def touch(self):
+		ContourList.changes += 1
+		self.version = ContourList.changes
+	append = _mutator(list.append)
+	extend = _mutator(list.extend)
+	insert = _mutator(list.insert)
+	remove = _mutator(list.remove)
+	pop = _mutator(list.pop)
+	sort = _mutator(list.sort)
+	reverse = _mutator(list.reverse)
+	__setitem__ = _mutator(list.__setitem__)
+	__delitem__ = _mutator(list.__delitem__)
+	__setslice__ = _mutator(list.__setslice__)
+	__delslice__ = _mutator(list.__delslice__)
+	__iadd__ = _mutator(list.__iadd__)
+	__imul__ = _mutator(list.__imul__)
+class Section(object):
 	def __init__(self, *args, **kwargs):
 		self.name = None # Series name + index
 		self.index = None
@@ -10,13 +44,18 @@ class Section:
 		self.image = None
 		self.contours = []
 		self._path = None
+		self._digest = None # sha1 of the XML file when this Section was read from it
 		self.processArguments(args, kwargs)
 	def processArguments(self, args, kwargs):
 		'''Populates data from the *args and **kwargs arguments via self.update.'''
+		names = kwargs.pop('names', None) # regex: only load matching Contours from XML
+		arrays = kwargs.pop('arrays', False) # load Contour points from XML as numpy arrays
+		cache = kwargs.pop('cache', None) # sectionCache directory to load XML through
+		transforms = kwargs.pop('transforms', None) # table of Transforms shared with other Sections (see Series)
 		# 1) ARGS
 		for arg in args:
 			try:
-				self.update(arg)
+				self.update(arg, names=names, arrays=arrays, cache=cache, transforms=transforms)
 			except:
 				print('Could not process Section arg: '+str(arg))
 		# 2) KWARGS #===
@@ -25,9 +64,22 @@ class Section:
 				self.update(kwarg)
 			except:
 				print('Could not process Section kwarg: '+str(kwarg))
+	@property
+	def contours(self):
+		return self._contours
+	@contours.setter
+	def contours(self, contours):
+		'''Contours are kept in a ContourList (a copy of <contours> if it is another list).'''
+		if not isinstance(contours, ContourList):
+			contours = ContourList(contours)
+		self._contours = contours
 # MUTATORS
-	def update(self, *args): #=== **kwargs eventually, need a way to choose overwrite or append to contours
-		'''Changes Section data from arguments. Assesses type of argument then determines where to place it.'''
+	def update(self, *args, **kwargs): #=== need a way to choose overwrite or append to contours
+		'''Changes Section data from arguments. Assesses type of argument then determines where to place it.
+		A path to an XML file only loads the Contours whose name matches kwargs['names'] (regex), if given, and
+		stores their points as numpy arrays if kwargs['arrays']. If kwargs['cache'] (directory) is given, the file is
+		loaded through pyrecon.tools.sectionCache. The file's sha1 is kept in self._digest. Equal Transforms are shared through the kwargs['transforms'] table
+		(see handleXML.internTransform).'''
 		for arg in args: # Assess type
 			# Dictionary argument
 			if type(arg) == type({}):
@@ -36,7 +88,7 @@ class Section:
 					if key in self.__dict__:
 						self.__dict__[key] = arg[key]
 					# Dict:List
-					elif type(arg[key]) == type([]):
+					elif isinstance(arg[key], list): # (also ContourList)
 						for item in arg[key]:
 							if item.__class__.__name__ == 'Image':
 								self.image = item
@@ -50,8 +102,18 @@ class Section:
 						self.contours.append(arg[key])
 			# String argument
 			elif type(arg) == type(''): # Possible path to XML?
-				import pyrecon.tools.handleXML as xml
-				self.update(*xml.process(arg))
+				import pyrecon.tools.sectionCache as sectionCache
+				if kwargs.get('cache'):
+					attributes, image, contours = sectionCache.processSection(arg, kwargs['cache'],
+						names=kwargs.get('names'), arrays=kwargs.get('arrays', False),
+						transforms=kwargs.get('transforms'))
+					self._digest = attributes.pop('digest')
+					self.update(attributes, image, contours)
+				else:
+					import pyrecon.tools.handleXML as xml
+					self._digest = sectionCache.fileDigest(arg)
+					self.update(*xml.process(arg, names=kwargs.get('names'), arrays=kwargs.get('arrays', False),
+						transforms=kwargs.get('transforms')))
 				self.name = arg.split('/')[-1]
 				self._path = os.path.dirname(arg)
 				if self._path[-1] != '/':
@@ -63,7 +125,7 @@ class Section:
 			elif arg.__class__.__name__ == 'Image':
 				self.image = arg
 			# List argument
-			elif type(arg) == type([]):
+			elif isinstance(arg, list): # (also ContourList)
 				for item in arg:
 					if item.__class__.__name__ == 'Contour':
 						self.contours.append(item)
@@ -106,4 +168,87 @@ class Section:
 				'index':self.index,
 				'thickness':self.thickness,
 				'alignLocked':self.alignLocked
-			}
\ No newline at end of file
+			}
+	def contentDigest(self):
+		'''Returns a sha1 hex digest of this Section's attributes, image and contours (Contour.geometryKey and their
+		other fields) as they are in memory, which changes when any of them is edited (unlike self._digest).'''
+		digest = hashlib.sha1(repr(sorted(self.attributes().items())))
+		if self.image is not None:
+			digest.update(repr((sorted(self.image.attributes().items()),
+				self.image.transform.key() if self.image.transform is not None else None)))
+		for contour in self.contours:
+			key = contour.geometryKey()
+			digest.update(repr(key[:-1]+tuple(getattr(contour, field) for field in
+				('comment', 'hidden', 'simplified', 'mode', 'border', 'fill'))))
+			digest.update(key[-1]) # points
+		return digest.hexdigest()
+	def contourAreas(self, contours=None):
+		'''Returns array of the world area of each of <contours> (default: self.contours), as Contour.getArea, in one
+		vectorized call'''
+		contours = self.contours if contours is None else contours
+		points, offsets = packPoints([contour.worldPoints() for contour in contours])
+		areas = np.abs(signedAreas(points, offsets))
+		areas[~np.array([bool(contour.closed) for contour in contours], dtype=bool)] = 0
+		return areas
+	def contourLengths(self, contours=None):
+		'''Returns array of the length of each of <contours> (default: self.contours), as Contour.getLength, in one
+		vectorized call'''
+		contours = self.contours if contours is None else contours
+		points, offsets = packPoints([contour.pointsArray() for contour in contours])
+		return pathLengths(points, offsets, [bool(contour.closed) for contour in contours])
+# curationTool functions
+	def locateReverseTraces(self):
+		'''Returns the reverse traces in this Section (see Contour.isReverse)'''
+		revTraces = []
+		for contour in self.contours:
+			try:
+				if contour.isReverse():
+					revTraces.append(contour)
+			except:
+				print('Invalid contour (%s on section %d) was ignored')%(contour.name, self.index)
+				print('\t check coordinates in XML file')
+		return revTraces
+	def locateDuplicates(self):
+		'''Returns the traces in this Section that completely overlap another trace of the same name, each listed once
+		in Section order'''
+		# Group contours by name, then exact copies (same Contour.geometryKey) of each name
+		byName = {}
+		for contour in self.contours:
+			byName.setdefault(contour.name, []).append(contour)
+		duplicates = set() # ids of duplicate contours
+		for name, contours in byName.items():
+			if len(contours) < 2:
+				continue
+			copies = {} # geometryKey -> contours
+			for contour in contours:
+				copies.setdefault(contour.geometryKey(), []).append(contour)
+			groups = [] # (bounds, copies) of contours that can overlap
+			for group in copies.values():
+				contour = group[0]
+				try:
+					contour.popShape()
+					if contour.shape is None or (contour.closed and contour.shape.area == 0):
+						continue # Overlaps nothing
+					groups.append((contour.bounds(), group))
+				except:
+					print('Invalid contour (%s on section %d) was ignored')%(contour.name, self.index)
+					print('\t check coordinates in XML file')
+					continue
+				if len(group) > 1: # Exact copies overlap completely
+					duplicates.update(id(cont) for cont in group)
+			# Compare groups whose bounds meet, sweeping along x
+			groups.sort(key=lambda group: group[0][0])
+			for i, (bounds, group) in enumerate(groups):
+				minx, miny, maxx, maxy = bounds
+				for obounds, ogroup in groups[i+1:]:
+					if obounds[0] > maxx:
+						break
+					if obounds[1] > maxy or miny > obounds[3]:
+						continue
+					try:
+						if group[0].overlaps(ogroup[0]) == 1: # Perfect overlap (within threshold)
+							duplicates.update(id(cont) for cont in group+ogroup)
+					except:
+						print('Invalid contour (%s on section %d) was ignored')%(ogroup[0].name, self.index)
+						print('\t check coordinates in XML file')
+		return [cont for cont in self.contours if id(cont) in duplicates]
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from Section import Section as Section
+
+class SectionCache:
+    '''Least-recently-used cache of parsed Sections shared by the SectionProxy objects of a Series. Sections changed
+    since they were parsed (see Section.contentDigest) are pinned: they stay in memory instead of being evicted.'''
+    def __init__(self, load=Section, resident=64):
+        self.load = load # Function that returns a Section from a path
+        self.resident = resident # Max number of unchanged parsed Sections kept in memory (None: no limit)
+        self.sections = OrderedDict() # path -> Section, least recently used first
+        self.digests = {} # path -> Section.contentDigest() when it was parsed, for self.sections
+        self.pinned = {} # path -> Section changed since it was parsed
+    def get(self, path):
+        '''Returns the Section at <path>, parsing it if it is not resident.'''
+        if path in self.pinned:
+            return self.pinned[path]
+        if path in self.sections:
+            section = self.sections.pop(path)
+        else:
+            section = self.load(path)
+            self.digests[path] = section.contentDigest()
+            self.evict()
+        self.sections[path] = section # (re)insert as most recently used
+        return section
+    def evict(self):
+        '''Drops least recently used Sections until fewer than self.resident remain, pinning changed ones.'''
+        if self.resident is None:
+            return
+        for path in list(self.sections):
+            if len(self.sections) < max(self.resident, 1):
+                break
+            section = self.sections.pop(path)
+            if section.contentDigest() != self.digests.pop(path):
+                self.pinned[path] = section
+    def __contains__(self, path):
+        return path in self.sections or path in self.pinned
+    def clear(self):
+        '''Drops every Section, including changed ones.'''
+        self.sections.clear()
+        self.digests.clear()
+        self.pinned.clear()
+
+class SectionProxy:
+    '''Stands in for the Section at <path>. The XML is parsed on first attribute access (other than name/index) and kept
+    in <cache>; unchanged Sections evicted from the cache are re-read from disk, changed ones stay in memory.'''
+    def __init__(self, path, cache):
+        self.__dict__['_file'] = path
+        self.__dict__['_cache'] = cache
+        self.__dict__['name'] = path.replace('\\','/').split('/')[-1]
+        self.__dict__['index'] = int(self.name.split('.')[-1]) # <seriesname>.<index>
+    def section(self):
+        '''Returns the parsed Section this proxy represents.'''
+        return self._cache.get(self._file)
+    def isLoaded(self):
+        return self._file in self._cache
+    def __getattr__(self, attr):
+        return getattr(self.section(), attr)
+    def __setattr__(self, attr, value):
+        if attr in ['name','index']:
+            self.__dict__[attr] = value
+        setattr(self.section(), attr, value)
+    def __repr__(self):
+        return '<SectionProxy %s>'%self.name
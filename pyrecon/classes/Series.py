@@ -1,7 +1,43 @@
-import os, re
+import os, re, multiprocessing, functools, bisect
 from Section import Section as Section
+from SectionProxy import SectionCache, SectionProxy
+from PointStore import PointStore, packPoints, pathLengths, signedAreas
+from NameIndex import NameIndex
+from Transform import Transform
+import numpy as np
 # handleXML is imported in Series.update()
 
+def _loadSection(path, names=None, arrays=False, cache=None, transforms=None):
+    '''Returns the Section at <path>, with only the Contours matching <names> (regex) if given and Contour points as
+    numpy arrays if <arrays>, read through the sectionCache <cache> directory if given, with Transforms from the
+    <transforms> table if given. Module-level so that it can be run in a worker process.'''
+    return Section(path, names=names, arrays=arrays, cache=cache, transforms=transforms)
+def _measureContours(found):
+    '''Returns (area, length) of each contour in <found> (list of (section, contour)), as Series.measureObject, in
+    one vectorized call.'''
+    world = []
+    validArea = []
+    for section, contour in found:
+        try:
+            if contour.closed and len(contour.points) < 3:
+                raise ValueError('closed contour with less than 3 points')
+            world.append(contour.worldPoints())
+            validArea.append(True)
+        except Exception:
+            world.append(np.zeros((0, 2)))
+            validArea.append(False)
+    closed = [bool(contour.closed) for section, contour in found]
+    points, offsets = packPoints(world)
+    areas = np.abs(signedAreas(points, offsets))
+    points, offsets = packPoints([contour.pointsArray() for section, contour in found])
+    lengths = pathLengths(points, offsets, closed)
+    measures = []
+    for i, (section, contour) in enumerate(found):
+        area = (float(areas[i]) if closed[i] else 0.0) if validArea[i] else None
+        length = float(lengths[i]) if not (closed[i] and len(contour.points) == 0) else None
+        measures.append((area, length))
+    return measures
+
 class Series:
     def __init__(self, *args, **kwargs):
         self.index = None
@@ -96,6 +132,9 @@ class Series:
         self.contours = []
         self.zcontours = []
         self.sections = []
+        self.transforms = {} # transformKey -> Transform shared by the loaded Sections
+        self._nameIndex = None # NameIndex of self.sections (see nameIndex)
+        self._digest = None # sha1 of the .ser file when this Series was read from it
         self.processArguments(args, kwargs)
     def processArguments(self, args, kwargs):
         # 1) ARGS
@@ -114,9 +153,11 @@ class Series:
             # String argument
             if type(arg) == type(''): # Possible path to XML?
                 import pyrecon.tools.handleXML as xml
+                import pyrecon.tools.sectionCache as sectionCache
                 try: # given full path to .ser file
                     self.update(*xml.process(arg))
                     self.path = arg
+                    self._digest = sectionCache.fileDigest(arg)
                     self.name = arg.split('/')[len(arg.split('/'))-1].replace('.ser','')
                 except: # given directory path instead of path to .ser file
                     path = arg
@@ -125,6 +166,7 @@ class Series:
                     path = path+str([f for f in os.listdir(path) if '.ser' in f].pop())
                     self.update(*xml.process(path))
                     self.path = path
+                    self._digest = sectionCache.fileDigest(path)
                     self.name = path.split('/')[len(path.split('/'))-1].replace('.ser','')
             # Dictionary
             elif type(arg) == type({}):
@@ -141,8 +183,8 @@ class Series:
                     elif item.__class__.__name__ == 'ZContour':
                         self.zcontours.append(item)
                     # Section
-                    elif item.__class__.__name__ == 'Section':
-                        self.sections.append(item)
+                    elif item.__class__.__name__ in ['Section', 'SectionProxy']:
+                        self.addSection(item)
             # Contour
             elif arg.__class__.__name__ == 'Contour':
                 self.contours.append(arg)
@@ -150,58 +192,155 @@ class Series:
             elif arg.__class__.__name__ == 'ZContour':
                 self.zcontours.append(item)         
             # Section
-            elif arg.__class__.__name__ == 'Section':
-                self.sections.append(arg)
-        for kwarg in kwargs:
-            # Load sections
-            if 'sections' in kwargs:
-                if kwargs['sections'] == True:
-                    print('Attempting to load sections...'),
-                    ser = os.path.basename(self.path)
-                    serfixer = re.compile(re.escape('.ser'), re.IGNORECASE)
-                    sername = serfixer.sub('', ser)
-                    # look for files with 'seriesname'+'.'+'number'
-                    p = re.compile('^'+sername+'[.][0-9]*$')
-                    sectionlist = [f for f in os.listdir(self.path.replace(ser,'')) if p.match(f)]
-                    # create and append Sections for each section file
-                    path = self.path.replace(os.path.basename(self.path),'')
-                    for sec in sectionlist:
-                        section = Section(path+sec)
-                        if section.index is not None: #===
-                            self.update(section)
-                    # sort sections by index
-                    self.sections = sorted(self.sections, key=lambda Section: Section.index)
-                    print(' SUCCESS!')
+            elif arg.__class__.__name__ in ['Section', 'SectionProxy']:
+                self.addSection(arg)
+        # Load sections
+        if kwargs.get('sections') == True:
+            self.loadSections(workers=kwargs.get('workers'), progress=kwargs.get('progress'),
+                              lazy=kwargs.get('lazy', False), resident=kwargs.get('resident', 64),
+                              indices=kwargs.get('indices'), names=kwargs.get('names'),
+                              arrays=kwargs.get('arrays', False), cache=kwargs.get('cache'))
+    def loadSections(self, workers=None, progress=None, lazy=False, resident=64, indices=None, names=None,
+                     arrays=False, cache=None):
+        '''Loads the Sections (<seriesname>.<number>) in this Series' directory. Section files are parsed in a pool of
+        <workers> processes (default: CPU count). <progress>(done, total) is called after each Section is loaded.
+        If <lazy>, self.sections holds SectionProxy objects that parse their file on first use, keeping at most
+        <resident> parsed Sections in memory. <indices> (e.g. range(a, b)) limits which section files are read and
+        <names> (regex) limits which Contours are loaded from them. If <arrays>, Contour points are numpy arrays.
+        If <cache> (True or a directory), unchanged section files are reloaded from a sidecar sectionCache.'''
+        print('Attempting to load sections...'),
+        paths = self.sectionPaths(indices)
+        if cache == True:
+            import pyrecon.tools.sectionCache as sectionCache
+            cache = sectionCache.cacheDirectory(self.path)
+        load = functools.partial(_loadSection, names=names, arrays=arrays, cache=cache, transforms=self.transforms)
+        if lazy:
+            cache = SectionCache(load=load, resident=resident)
+            self.sections.extend(SectionProxy(path, cache) for path in paths)
+            self.sections = sorted(self.sections, key=lambda Section: Section.index)
+            self._nameIndex = None # (re)built on first use
+            print(' SUCCESS!')
+            return
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        pool = None
+        if workers > 1 and len(paths) > 1:
+            pool = multiprocessing.Pool(min(workers, len(paths)))
+            # Workers cannot share self.transforms; their Sections' Transforms are interned as they arrive
+            work = functools.partial(_loadSection, names=names, arrays=arrays, cache=cache)
+            sections = pool.imap(work, paths, chunksize=max(1, len(paths)//(workers*8)))
+        else:
+            sections = (load(path) for path in paths)
+        try:
+            for done, section in enumerate(sections, 1):
+                if section.index is not None: #===
+                    if pool is not None:
+                        self.internTransforms(section)
+                    self.update(section)
+                if progress is not None:
+                    progress(done, len(paths))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        # sort sections by index
+        self.sections = sorted(self.sections, key=lambda Section: Section.index)
+        self._nameIndex = None # (re)built on first use
+        print(' SUCCESS!')
+    def internTransforms(self, section):
+        '''Replaces the Transforms of <section>'s image and contours with the equal ones in self.transforms, adding
+        those not in it yet, so that each distinct Transform is shared by the whole Series.'''
+        interned = {} # id(Transform) -> Transform in self.transforms
+        def intern(tform):
+            if tform is None:
+                return None
+            if id(tform) not in interned:
+                interned[id(tform)] = self.transforms.setdefault(tform.key(), tform)
+            return interned[id(tform)]
+        if section.image is not None:
+            section.image.transform = intern(section.image.transform)
+        for contour in section.contours:
+            contour.transform = intern(contour.transform)
+    def addSection(self, section):
+        '''Appends <section> to self.sections, updating the name index.'''
+        self.sections.append(section)
+        if self._nameIndex is not None:
+            self._nameIndex.add(section)
+    def removeSection(self, section):
+        '''Removes <section> from self.sections. (The name index is rebuilt on next use, as section positions change.)'''
+        self.sections = [sec for sec in self.sections if sec is not section]
+        self._nameIndex = None
+    def nameIndex(self):
+        '''Returns the NameIndex (contour name -> (section position, contour position) occurrences) of self.sections,
+        building it on first use. Sections whose contours changed since are re-indexed when it is returned, and it is
+        rebuilt if the number of sections changed or a Contour was renamed (see NameIndex.update).'''
+        if self._nameIndex is None or not self._nameIndex.update(self.sections):
+            self._nameIndex = NameIndex(self.sections)
+        return self._nameIndex
+    def occurrences(self, name):
+        '''Returns the (section, contour) occurrences of contour <name>, in section order (see nameIndex).'''
+        index = self.nameIndex()
+        found = []
+        for position, i in index.lookup(name):
+            section = self.sections[position]
+            contours = section.contours
+            if i >= len(contours) or contours[i].name != name: # An evicted SectionProxy was re-read
+                index.refresh(position, section)
+                return self.occurrences(name)
+            found.append((section, contours[i]))
+        return found
+    def sectionPaths(self, indices=None):
+        '''Returns paths to the section files (<seriesname>.<number>) in this Series' directory, optionally only those
+        whose number is in <indices>.'''
+        ser = os.path.basename(self.path)
+        serfixer = re.compile(re.escape('.ser'), re.IGNORECASE)
+        sername = serfixer.sub('', ser)
+        # look for files with 'seriesname'+'.'+'number'
+        p = re.compile('^'+sername+'[.][0-9]*$')
+        path = self.path.replace(ser,'')
+        sectionlist = [f for f in os.listdir(path) if p.match(f)]
+        if indices is not None:
+            indices = set(indices)
+            sectionlist = [f for f in sectionlist if f.split('.')[-1] and int(f.split('.')[-1]) in indices]
+        return [path+f for f in sectionlist]
 # ACCESSORS
     def attributes(self):
         '''Returns a dict of this Serie's attributes'''
-        not_attributes = ['name','path','contours','zcontours','sections']
+        not_attributes = ['name','path','contours','zcontours','sections','transforms','_nameIndex','_digest']
         attributes = {}
         for att in self.__dict__:
             if att not in not_attributes: # if att is considered a desired attribute
                 attributes[att] = self.__dict__[att]
         return attributes
+    def pointStore(self, path=None, views=True):
+        '''Returns a PointStore of all section Contours, memory-mapped to <path> (default: a temporary file). If
+        <views>, the Contours' points become views into the store.'''
+        return PointStore(self, path, views)
     def deleteTraces(self, exceptions=[]):
         '''Deletes all traces except the regex found in exceptions list'''
-        for section in self.sections:
-            for contour in section.contours:
-                for regex in exceptions:
-                    if re.compile(regex).match(contour.name):
-                        pass
-                    else:
-                        print 'Removing:', contour.name
-                        section.contours.remove(contour)
+        if len(exceptions) == 0:
+            return
+        index = self.nameIndex()
+        regexes = [re.compile(regex) for regex in exceptions]
+        removed = {} # section position -> positions of contours to remove
+        for name in index.names:
+            if not any(regex.match(name) for regex in regexes):
+                for position, i in index.lookup(name):
+                    print 'Removing:', name
+                    removed.setdefault(position, set()).add(i)
+        for position, contours in removed.items():
+            section = self.sections[position]
+            section.contours = [cont for i, cont in enumerate(section.contours) if i not in contours]
 # calibrationTool functions
     def zeroIdentity(self):
         '''Converts points for all sections in a series to identity transform'''
+        identity = Transform({'dim':0, 'xcoef':[0,1,0,0,0,0], 'ycoef':[0,0,1,0,0,0]})
+        identity = self.transforms.setdefault(identity.key(), identity)
         for sec in self.sections:
             for c in sec.contours:
                 if c.image is None: # Don't alter image contours i.e. domain1     
                     c.points = c.transform.worldpts(c.points)
-                    c.transform.dim = 0
-                    c.transform.ycoef = [0,0,1,0,0,0]
-                    c.transform.xcoef = [0,1,0,0,0,0]
-                    c._tform = c.transform.tform()
+                    c.transform = identity # Transforms are shared by other contours; don't modify them
 # curationTool functions
     def locateInvalidTraces(self, delete=False):
         invalidDict = {}
@@ -219,102 +358,56 @@ class Series:
     def locateReverseTraces(self):
         reverseDict = {}
         for section in self.sections:
-            revTraces = []
-            for contour in section.contours:
-                try:
-                    if contour.isReverse():
-                        revTraces.append(contour)
-                except:
-                        print('Invalid contour (%s on section %d) was ignored')%(contour.name, section.index)
-                        print('\t check coordinates in XML file')
+            revTraces = section.locateReverseTraces()
             if len(revTraces) != 0:
                 reverseDict[section.index] = revTraces
         return reverseDict
+    @staticmethod
+    def distantTraces(sectionNames, thresholds, index):
+        '''Returns a dictionary of each threshold in <thresholds> -> dictionary of section index -> names in
+        <sectionNames> (a list of names for each section, the first numbered <index>) that reappear more than threshold
+        sections above or below. A name is listed once for each direction it reappears in.'''
+        # Sections each name appears in, ascending
+        positions = {}
+        for sec, names in enumerate(sectionNames):
+            for name in names:
+                positions.setdefault(name, []).append(sec)
+        distantTraces = dict((threshold, {}) for threshold in thresholds)
+        for sec, names in enumerate(sectionNames):
+            for name in names:
+                secs = positions[name]
+                k = bisect.bisect_left(secs, sec)
+                above = secs[k+1]-sec if k+1 < len(secs) else None # Sections to next appearance
+                below = sec-secs[k-1] if k > 0 else None # Sections to previous appearance
+                for threshold in thresholds:
+                    if above is not None and above > threshold:
+                        distantTraces[threshold].setdefault(sec+index, []).append(name)
+                    if below is not None and below > threshold:
+                        distantTraces[threshold].setdefault(sec+index, []).append(name)
+        return distantTraces
     def locateDistantTraces(self, threshold=7):
-        '''Returns a dictionary of indexes containing traces that exist after <threshold (def: 7)> sections of non-existence'''
-        # Build a list of lists for all the contours in each section
-        allSectionContours = []
-        for section in self.sections:
-            contours = list(set([cont.name for cont in section.contours]))
-            allSectionContours.append(contours)
-        # Go through list of contours and check for distances
+        '''Returns a dictionary of indexes containing traces that exist after <threshold (def: 7)> sections of
+        non-existence. If <threshold> is a list, returns a dictionary of each threshold -> its dictionary.'''
+        sectionNames = [list(set([cont.name for cont in section.contours])) for section in self.sections]
         index = int(self.sections[0].index) # correct starting index (can be 0 or 1)
-        distantTraces = {}
-        for sec in range(len(allSectionContours)):
-            traces = []
-            for contour in allSectionContours[sec]:
-                # Check above
-                if sec+threshold+1 <= len(self.sections):
-                    # Check and ignore if in section:section+threshold
-                    sectionToThresholdContours = [] 
-                    for contList in allSectionContours[sec+1:sec+threshold+1]:
-                        sectionToThresholdContours.extend(contList)
-                    if contour not in sectionToThresholdContours:
-                        # Check if contour is in section+threshold and up
-                        thresholdToEndContours = []
-                        for contList in allSectionContours[sec+threshold+1:]:
-                            thresholdToEndContours.extend(contList)
-                        if contour in thresholdToEndContours:
-                            traces.append(contour)
-                # Check below
-                if sec-threshold-1 >= 0:
-                    # Check and ignore if in section-threshold:section
-                    minusThresholdToSectionContours = []
-                    for contList in allSectionContours[sec-threshold:sec]:
-                        minusThresholdToSectionContours.extend(contList)
-                    if contour not in minusThresholdToSectionContours:
-                        # Check if contour is in section-threshold and down
-                        beginToMinusThresholdContours = []
-                        for contList in allSectionContours[:sec-threshold]:
-                            beginToMinusThresholdContours.extend(contList)
-                        if contour in beginToMinusThresholdContours:
-                            traces.append(contour)
-                # Add traces to distantTraces dictionary
-                if len(traces) != 0:
-                    distantTraces[index] = traces
-            index += 1
-        return distantTraces
+        if isinstance(threshold, (list, tuple)):
+            return self.distantTraces(sectionNames, threshold, index)
+        return self.distantTraces(sectionNames, [threshold], index)[threshold]
     def locateDuplicates(self):
-        '''Locates overlapping traces of the same name in a section. Returns a dictionary of section numbers with duplicates'''
-        # Build dictionary of sections w/ contours whose name appear more than once in that section
-        duplicateNames = {}
-        for section in self.sections:
-            duplicates = []
-            contourNames = [cont.name for cont in section.contours] # List of contour names
-            # Go through each contour, see if name appears in contourName > 1 time
-            for contour in section.contours:
-                if contourNames.count(contour.name) > 1:
-                    duplicates.append(contour)
-            if len(duplicates) != 0:
-                duplicateNames[section.index] = duplicates
-        
-        # Go through each list of >1 contour names and check if actually overlaps
+        '''Locates overlapping traces of the same name in a section. Returns a dictionary of section numbers with
+        duplicates (each duplicate trace listed once, in section order, see Section.locateDuplicates)'''
         duplicateDict = {}
-        for key in duplicateNames:
-            duplicates = []
-            for contour in duplicateNames[key]:
-                # Filter contours of same memory address so that overlap isn't tested on itself
-                copyContours = [cont for cont in duplicateNames[key] if id(cont) != id(contour) and cont.name == contour.name]
-                for cont in copyContours:
-                    try:
-                        if contour.overlaps(cont) == 1: # Perfect overlap (within threshold)
-                            duplicates.append(cont)
-                    except:
-                        print('Invalid contour (%s on section %d) was ignored')%(cont.name, key)
-                        print('\t check coordinates in XML file')
+        for section in self.sections:
+            duplicates = section.locateDuplicates()
             if len(duplicates) != 0:
-                duplicateDict[key] = duplicates
+                duplicateDict[section.index] = duplicates
         return duplicateDict
 # excelTool functions
     def getContours(self, regex):
-        contours = []
-        for section in self.sections:
-            sectionContours = [contour for contour in section.contours if re.match(regex, contour.name)]
-            contours.extend(sectionContours)
-        keys = {contour.name for contour in contours}
+        '''Returns a dictionary of each contour name matching <regex> -> its contours, in section order'''
         contourDict = {}
-        for key in keys:
-            contourDict[key] = [contour for contour in contours if contour.name == key]
+        for key in self.nameIndex().match(regex):
+            contourDict[key] = [contour for section, contour in self.occurrences(key)]
         return contourDict
 
     def getObject(self, regex):
@@ -323,8 +416,9 @@ class Series:
         for section in self.sections:
             section.append(section.getObject(regex))
         return objects  
-    def getObjectLists(self):
-        '''Returns sorted lists of dendrite names, protrusion names, trace names, and a list of other objects in series'''
+    def getObjectLists(self, names=None):
+        '''Returns sorted lists of dendrite names, protrusion names, trace names, and a list of other objects in series
+        (or in the contour <names> given, e.g. measurementTable()['name'])'''
         dendrite_expression = 'd[0-9]{2,}' # represents base dendrite name (d##)
         protrusion_expression = 'd[0-9]{2,}p[0-9]{2,}$' # represents base protrusion name (d##p##)
         trace_expression = 'd[0-9]{2,}.{1,}[0-9]{2,}' # represents trace name (d##<tracetype>##)
@@ -339,28 +433,29 @@ class Series:
         protrusions = []
         traces = []
         others = []
-        for section in self.sections:
-            for contour in section.contours:
-                # Dendrite
-                if dendrite_expression.match(contour.name) != None:
-                    dendrites.append(contour.name[0:dendrite_expression.match(contour.name).end()])
-                # Protrusion
-                if protrusion_expression.match(contour.name) != None:
-                    protrusions.append(contour.name)
-                # Trace === expand to > 2 digits!
-                if (trace_expression.match(contour.name) != None and
-                    protrusion_expression.match(contour.name) == None):
-                    traces.append(contour.name)
-                    # Make sure a d##p## exists for this trace
-                    thisProt = contour.name[0:3]+'p'+contour.name[4:6]
-                    if (protrusion_expression.match(thisProt) and
-                        thisProt not in protrusions):
-                        protrusions.append(thisProt)
-                # Everything else (other)
-                if (dendrite_expression.match(contour.name) == None and
-                    protrusion_expression.match(contour.name) == None and
-                    trace_expression.match(contour.name) == None):
-                    others.append(contour.name)
+        if names is None:
+            names = self.nameIndex().names
+        for name in names:
+            # Dendrite
+            if dendrite_expression.match(name) != None:
+                dendrites.append(name[0:dendrite_expression.match(name).end()])
+            # Protrusion
+            if protrusion_expression.match(name) != None:
+                protrusions.append(name)
+            # Trace === expand to > 2 digits!
+            if (trace_expression.match(name) != None and
+                protrusion_expression.match(name) == None):
+                traces.append(name)
+                # Make sure a d##p## exists for this trace
+                thisProt = name[0:3]+'p'+name[4:6]
+                if (protrusion_expression.match(thisProt) and
+                    thisProt not in protrusions):
+                    protrusions.append(thisProt)
+            # Everything else (other)
+            if (dendrite_expression.match(name) == None and
+                protrusion_expression.match(name) == None and
+                trace_expression.match(name) == None):
+                others.append(name)
         return sorted(list(set(dendrites))), sorted(list(set(protrusions))), sorted(list(set(traces))), sorted(list(set(others)))
     def getData(self, object_name, data_string):
         string = str(data_string).lower()
@@ -382,24 +477,20 @@ class Series:
         '''Returns volume of the object throughout the series. Volume calculated by summing the value obtained by
         multiplying the area by section thickness over all sections.'''
         vol = 0
-        for section in self.sections:
-            for contour in section.contours:
-                if contour.name == object_name:
-                    try:
-                        contour.popShape()
-                        vol += (contour.shape.area * section.thickness)
-                    except:
-                        print 'getVolume(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+        for section, contour, area, length in self.measureObject(object_name):
+            if area is None:
+                print 'getVolume(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+                continue
+            vol += (area * section.thickness)
         return vol
     def getTotalVolume(self, object_name):
         related_objects = []
         if object_name[-1].isalpha():
             object_name = object_name[:-1]
             # Get all related objects by base object name
-            for section in self.sections:
-                for contour in section.contours:
-                    if object_name in contour.name:
-                        related_objects.append(contour.name)
+            for name in self.nameIndex().names:
+                if object_name in name:
+                    related_objects.append(name)
         # Find total volume by summing volume for all related objects
         totVol = 0
         for obj in list(set(related_objects)):
@@ -409,45 +500,90 @@ class Series:
         '''Returns surface area of the object throughout the series. Surface area calculated by summing
         the length multiplied by section thickness across sections.'''
         sArea = 0
-        for section in self.sections:
-            for contour in section.contours:
-                if contour.name == object_name:
-                    try:
-                        sArea += (contour.getLength() * section.thickness)
-                    except:
-                        print 'getSurfaceArea(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+        for section, contour, area, length in self.measureObject(object_name):
+            if length is None:
+                print 'getSurfaceArea(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+                continue
+            sArea += (length * section.thickness)
         return sArea
     def getFlatArea(self, object_name):
         '''Returns the flat area of the object throughout the series. Flat area calculated by summing the area of
         the object across all sections.'''
         fArea = 0
-        for section in self.sections:
-            for contour in section.contours:
-                if contour.name == object_name:
-                    try:
-                        contour.popShape()
-                        if contour.closed:
-                            fArea += contour.shape.area
-                        else:
-                            fArea += (contour.getLength() * section.thickness)
-                    except:
-                        print 'getFlatArea(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+        for section, contour, area, length in self.measureObject(object_name):
+            if area is None or length is None:
+                print 'getFlatArea(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+            elif contour.closed:
+                fArea += area
+            else:
+                fArea += (length * section.thickness)
         return fArea
+    def measureObject(self, object_name):
+        '''Returns (section, contour, area, length) for each contour named <object_name>, with area as Contour.getArea
+        and length as Contour.getLength, computed for all of them in one vectorized call (see PointStore.signedAreas
+        and pathLengths). Area is None for invalid contours (closed with less than 3 points, or whose points cannot be
+        transformed), length for closed contours without points.'''
+        found = self.occurrences(object_name)
+        return [(section, contour, area, length)
+                for (section, contour), (area, length) in zip(found, _measureContours(found))]
+    def measurementTable(self):
+        '''Returns the start, end, count, volume, surface area and flat area (as getData) of every object (contour
+        name) in the series, from one pass over its contours. The result is a dictionary of columns: 'name' (sorted
+        list), 'row' (dict of name -> position in the columns) and a numpy array for each of the getData strings
+        'start', 'end', 'count', 'volume', 'surface area' and 'flat area'.'''
+        names = sorted(set(contour.name for section in self.sections for contour in section.contours))
+        row = dict((name, i) for i, name in enumerate(names))
+        start = np.zeros(len(names), dtype=np.int64)
+        end = np.zeros(len(names), dtype=np.int64)
+        found = [(section, contour) for section in self.sections for contour in section.contours]
+        for section in self.sections:
+            for name in set(contour.name for contour in section.contours):
+                if start[row[name]] == 0: # (as getStartEndCount: a start of 0 is replaced by the next start)
+                    start[row[name]] = section.index
+                end[row[name]] = section.index
+        # Per-contour columns, summed per name (np.bincount adds in contour order, as the get* functions)
+        rows = np.array([row[contour.name] for section, contour in found], dtype=np.int64)
+        thickness = np.array([section.thickness for section, contour in found], dtype=np.float64)
+        closed = np.array([bool(contour.closed) for section, contour in found], dtype=bool)
+        areas = np.zeros(len(found), dtype=np.float64)
+        lengths = np.zeros(len(found), dtype=np.float64)
+        validArea = np.ones(len(found), dtype=bool)
+        validLength = np.ones(len(found), dtype=bool)
+        for i, (area, length) in enumerate(_measureContours(found)):
+            if area is None:
+                validArea[i] = False
+            else:
+                areas[i] = area
+            if length is None:
+                validLength[i] = False
+            else:
+                lengths[i] = length
+            if area is None or length is None:
+                section, contour = found[i]
+                print 'measurementTable(): Invalid contour:', contour.name, 'in section index:', section.index, '\nCheck XML file and fix before trusting data.\n'
+        def total(values, valid):
+            return np.bincount(rows[valid], weights=values[valid], minlength=len(names)).astype(np.float64)
+        flat = np.where(closed, areas, lengths*thickness)
+        return {'name':names,
+                'row':row,
+                'start':start,
+                'end':end,
+                'count':np.bincount(rows, minlength=len(names)).astype(np.int64),
+                'volume':total(areas*thickness, validArea),
+                'surface area':total(lengths*thickness, validLength),
+                'flat area':total(flat, validArea & validLength)}
     def getStartEndCount(self, object_name):
         '''Returns a tuple containing the start index, end index, and count of the item in series.'''
         start = 0
         end = 0
-        count = 0
+        index = self.nameIndex()
         # Count
-        for section in self.sections:
-            for contour in section.contours:
-                if contour.name == object_name:
-                    count += 1
-            # Start/End
-            if object_name in [cont.name for cont in section.contours]:
-                # Start index
-                if start == 0:
-                    start = section.index
-                # End index
-                end = section.index
+        count = len(index.lookup(object_name))
+        # Start/End
+        for section in [self.sections[position] for position in index.positions(object_name)]:
+            # Start index
+            if start == 0:
+                start = section.index
+            # End index
+            end = section.index
         return start, end, count
\ No newline at end of file
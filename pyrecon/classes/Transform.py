@@ -1,7 +1,12 @@
 import numpy as np
 from skimage import transform as tf
 
-class Transform:
+def transformKey(dim, xcoef, ycoef):
+    '''Returns a hashable key of exact transform coefficients (1 and 1.0 differ, as they are written differently).'''
+    return (dim, tuple(map(repr, xcoef or ())), tuple(map(repr, ycoef or ())))
+
+class Transform(object):
+    __slots__ = ('dim','xcoef','ycoef','_tform') # No instance __dict__
     def __init__(self, *args, **kwargs):
         self.dim = None
         self.xcoef = None
@@ -27,8 +32,8 @@ class Transform:
             # Dictionary
             if type(arg) == type({}):
                 for key in arg:
-                    if key in self.__dict__:
-                        self.__dict__[key] = arg[key]
+                    if key in self.__slots__:
+                        setattr(self, key, arg[key])
                 # Recreate self._tform everytime attributes is updated
                 self._tform = self.tform()
             # self._tform (skimage.transform._geometric.AffineTransform)
@@ -41,6 +46,16 @@ class Transform:
                 self.ycoef == other.ycoef)
     def __ne__(self, other):
         return not self.__eq__(other)
+    def __getstate__(self):
+        '''Pickle without self._tform (polynomial inverses are closures); it is rebuilt in __setstate__.'''
+        return {'dim':self.dim, 'xcoef':self.xcoef, 'ycoef':self.ycoef}
+    def __setstate__(self, state):
+        for key in ['dim','xcoef','ycoef']:
+            setattr(self, key, state.get(key))
+        self._tform = self.tform()
+    def key(self):
+        '''Returns the key equal Transforms are interned by (see Series.transforms).'''
+        return transformKey(self.dim, self.xcoef, self.ycoef)
     def worldpts(self, points, mag=1): #===
         '''Returns inverse points'''
         newpts = self._tform.inverse(np.asarray(points)*mag)
@@ -88,44 +103,40 @@ class Transform:
             # create matrix of coefficients 
             tforward = tf.PolynomialTransform(tmatrix)
             def getrevt(pts): # pts are a np.array
-                newpts = [] # list of final estimates of (x,y)
-                for i in range( len(pts) ):
-                    # (u,v) for which we want (x,y)
-                    u, v = pts[i,0], pts[i,1] # input pts
-                    # initial guess of (x,y)
-                    x0, y0 = 0.0, 0.0
-                    # get forward tform of initial guess
-                    uv0 = tforward(np.array([x0,y0]).reshape([1, 2]))[0]
-                    u0 = uv0[0]
-                    v0 = uv0[1]
-                    e = 1.0 # reduce error to this limit 
-                    epsilon = 5e-10
-                    i = 0
-                    while e > epsilon and i < 100: #=== 10 -> 100
-                        i+=1
-                        # compute Jacobian
-                        l = a[1] + a[3]*y0 + 2.0*a[4]*x0
-                        m = a[2] + a[3]*x0 + 2.0*a[5]*y0
-                        n = b[1] + b[3]*y0 + 2.0*b[4]*x0
-                        o = b[2] + b[3]*x0 + 2.0*b[5]*y0
-                        p = l*o - m*n # determinant for inverse
-                        if abs(p) > epsilon:
-                            # increment x0,y0 by inverse of Jacobian
-                            x0 = x0 + ((o*(u-u0) - m*(v-v0))/p)
-                            y0 = y0 + ((l*(v-v0) - n*(u-u0))/p)
-                        else:
-                            # try Jacobian transpose instead
-                            x0 = x0 + (l*(u-u0) + n*(v-v0))        
-                            y0 = y0 + (m*(u-u0) + o*(v-v0))
-                        # get forward tform of current guess       
-                        uv0 = tforward(np.array([x0,y0]).reshape([1, 2]))[0]
-                        u0 = uv0[0]
-                        v0 = uv0[1]
-                        # compute closeness to goal
-                        e = abs(u-u0) + abs(v-v0)
-                    # append final estimate of (x,y) to newpts list
-                    newpts.append((x0,y0))     
-                newpts = np.asarray(newpts)           
-                return newpts
+                '''Newton's method on all points at once; converged points are masked out of further iterations.'''
+                pts = np.asarray(pts, dtype=float).reshape((-1, 2))
+                # (u,v) for which we want (x,y)
+                u, v = pts[:,0], pts[:,1] # input pts
+                # initial guess of (x,y)
+                x0, y0 = np.zeros(len(pts)), np.zeros(len(pts))
+                # get forward tform of initial guess
+                uv0 = tforward(np.zeros((len(pts), 2)))
+                u0, v0 = uv0[:,0], uv0[:,1]
+                epsilon = 5e-10 # reduce error to this limit
+                active = np.ones(len(pts), dtype=bool) # points not yet within epsilon
+                for i in range(100): #=== 10 -> 100
+                    if not active.any():
+                        break
+                    x, y = x0[active], y0[active]
+                    du, dv = u[active]-u0[active], v[active]-v0[active]
+                    # compute Jacobian
+                    l = a[1] + a[3]*y + 2.0*a[4]*x
+                    m = a[2] + a[3]*x + 2.0*a[5]*y
+                    n = b[1] + b[3]*y + 2.0*b[4]*x
+                    o = b[2] + b[3]*x + 2.0*b[5]*y
+                    p = l*o - m*n # determinant for inverse
+                    invertible = np.abs(p) > epsilon
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        # increment x0,y0 by inverse of Jacobian, or try Jacobian transpose instead
+                        x = np.where(invertible, x + ((o*du - m*dv)/p), x + (l*du + n*dv))
+                        y = np.where(invertible, y + ((l*dv - n*du)/p), y + (m*du + o*dv))
+                    x0[active], y0[active] = x, y
+                    # get forward tform of current guess
+                    uv = tforward(np.column_stack((x, y)))
+                    u0[active], v0[active] = uv[:,0], uv[:,1]
+                    # compute closeness to goal
+                    e = np.abs(u[active]-u0[active]) + np.abs(v[active]-v0[active])
+                    active[active] = e > epsilon
+                return np.column_stack((x0, y0))
             tforward.inverse = getrevt
             return tforward
\ No newline at end of file
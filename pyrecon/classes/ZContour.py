@@ -1,5 +1,6 @@
 import math
-class ZContour:
+class ZContour(object):
+    __slots__ = ('name','closed','border','fill','mode','points') # No instance __dict__
     def __init__(self, *args, **kwargs):
         self.name = None
         self.closed = None
@@ -27,14 +28,19 @@ class ZContour:
             if type(arg) == type({}):
                 for key in arg:
                     # Dict:attributes
-                    if key in self.__dict__:
-                        self.__dict__[key] = arg[key]
+                    if key in self.__slots__:
+                        setattr(self, key, arg[key])
     def __eq__(self,other):
         return (self.name == other.name and
                 self.points == other.points and
                 self.closed == other.closed)
     def __ne__(self,other):
         return not self.__eq__(other)
+    def __getstate__(self):
+        return dict((key, getattr(self, key)) for key in self.__slots__)
+    def __setstate__(self, state):
+        for key in state:
+            setattr(self, key, state[key])
     # mergeTool Functions
     def overlaps(self, other, threshold=(1+2**(-17))):
         def distance(pt0, pt1):
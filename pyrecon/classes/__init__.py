@@ -2,7 +2,10 @@ __all__ = [
 	'Contour',
 	'Image',
 	'MultiSectionContour',
+	'NameIndex',
+	'PointStore',
 	'Section',
+	'SectionProxy',
 	'Series',
 	'Transform',
 	'ZContour'
@@ -11,7 +14,10 @@ __all__ = [
 from Contour import *
 from Image import *
 from MultiSectionContour import *
+from NameIndex import *
+from PointStore import *
 from Section import *
+from SectionProxy import *
 from Series import *
 from Transform import *
 from ZContour import *
\ No newline at end of file
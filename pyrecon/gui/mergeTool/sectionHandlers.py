@@ -397,7 +397,7 @@ class contourPixmap(QLabel):
 		QLabel.__init__(self)
 		self.image = image
 		self.pixmap = QPixmap( image._path+image.src ) 
-		self.contour = pyrecon.classes.Contour( contour.__dict__ ) # Create copy of contour to be altered for visualization
+		self.contour = pyrecon.classes.Contour( contour.__getstate__() ) # Create copy of contour to be altered for visualization
 		self.transformToPixmap()
 		self.crop()
 		self.scale()
@@ -115,9 +115,9 @@ class SeriesContourHandler(QWidget):
 		self.leftLabel = QLabel()
 		self.rightLabel = QLabel()
 		for cont in self.merge.series1.contours:
-			self.leftLabel.setText(str(self.leftLabel.text())+'\n'.join(str(contour.__dict__) for contour in self.merge.series1.contours)+'\n')
+			self.leftLabel.setText(str(self.leftLabel.text())+'\n'.join(str(contour.__getstate__()) for contour in self.merge.series1.contours)+'\n')
 		for cont in self.merge.series2.contours:
-			self.rightLabel.setText(str(self.rightLabel.text())+'\n'.join(str(contour.__dict__) for contour in self.merge.series2.contours)+'\n')
+			self.rightLabel.setText(str(self.rightLabel.text())+'\n'.join(str(contour.__getstate__()) for contour in self.merge.series2.contours)+'\n')
 		self.leftLabel.setWordWrap(True)
 		self.rightLabel.setWordWrap(True)
 		# Adjust font
@@ -5,8 +5,16 @@ try:
 except:
     print('Problem importing PySide. You will not be able to use GUI functions.')
 
-def openSeries(path):
-    '''Returns a Series object with associated Sections from the same directory.'''
+def openSeries(path, workers=None, progress=None, lazy=False, resident=64, sections=None, names=None, arrays=False,
+               cache=False):
+    '''Returns a Series object with associated Sections from the same directory. Sections are parsed in a pool of
+    <workers> processes (default: CPU count); <progress>(done, total) is called as each Section is loaded.
+    If <lazy>, Sections are parsed on first use and at most <resident> unchanged ones are kept in memory (see
+    SectionCache).
+    <sections> (e.g. range(a, b)) limits which section indices are read; <names> (regex) limits which Contours are
+    loaded from them (the domain1 image contour is always kept). If <arrays>, Contour points are (N, 2) numpy
+    arrays instead of lists of (x, y) tuples. If <cache> (True or a directory), parsed sections are kept in a
+    sidecar cache (default: .pyrecon/<series>/ next to the .ser file) and unchanged section files are reloaded from it.'''
     from pyrecon.classes import Section, Series
     import os
     # Process <path> and create Series object
@@ -17,7 +25,8 @@ def openSeries(path):
             path += '/'
         pathToSeries = path+str([f for f in os.listdir(path) if '.ser' in f].pop())
     series = Series(pathToSeries)
-    series.update(sections=True) # find sections in directory
+    series.update(sections=True, workers=workers, progress=progress, lazy=lazy, resident=resident,
+                  indices=sections, names=names, arrays=arrays, cache=cache) # find sections in directory
     return series
 
 def start():
@@ -4,7 +4,9 @@ __all__ = [
 	'excelTool',
 	'mergeTool',
 	'handleXML',
-    'measurementTools'
+	'sectionCache',
+    'measurementTools',
+	'workerPool'
 ]
 
 import calibrationTool
@@ -12,4 +14,6 @@ import curationTool
 import excelTool
 import mergeTool
 import handleXML
-import measurementTools
\ No newline at end of file
+import sectionCache
+import measurementTools
+import workerPool
\ No newline at end of file
@@ -19,42 +19,48 @@ def findCalFactor(series):
         return
     # create list of all image transforms in a series
     imgtforms = []
+    tags = {} # id(transform) -> description of the images it belongs to (Transforms can be shared between sections)
+    affines = {} # id(transform) -> its AffineTransform (Transform._tform is left alone, as the Transform is shared)
     for section in ser.sections:
         imgtform = section.image.transform
         if imgtform.isAffine():
-            imgtform.tag = 'Transform for '+section.image.src+' in section '+section.name # Change tag to include the section it belongs to
+            tag = 'Transform for '+section.image.src+' in section '+section.name # Include the section it belongs to
+            if id(imgtform) in tags:
+                tags[id(imgtform)] += '\n'+tag
+                continue
+            tags[id(imgtform)] = tag
             # Convert to Affine Transform and append
             a = imgtform.xcoef
             b = imgtform.ycoef
             tmatrix = np.array( [a[1],a[2],a[0],b[1],b[2],b[0],0,0,1] ).reshape((3,3)) # 1x9 -> 3x3
-            imgtform._tform = tf.AffineTransform(tmatrix)
+            affines[id(imgtform)] = tf.AffineTransform(tmatrix)
             imgtforms.append(imgtform)   
     
     # find tforms where shear and rotation = 0, scale x and scale y are the same       
     tforms2 = [] 
     for t in imgtforms:
-        if int(t._tform.rotation) == 0 and \
-        int(t._tform.shear) == 0 and \
-        t._tform.scale[0] == t._tform.scale[1]:
+        if int(affines[id(t)].rotation) == 0 and \
+        int(affines[id(t)].shear) == 0 and \
+        affines[id(t)].scale[0] == affines[id(t)].scale[1]:
             tforms2.append(t)
     
     # find tforms with scale values closest to 1
-    minScale = tforms2[0]._tform.scale[0] #start with 1st transform in list
+    minScale = affines[id(tforms2[0])].scale[0] #start with 1st transform in list
     minT = tforms2[0]
     multiMins = []
     
     for tform in tforms2[1:]:
-        if abs(tform._tform.scale[0])-1 < abs(minScale)-1:
-            minScale = tform._tform.scale[0]
+        if abs(affines[id(tform)].scale[0])-1 < abs(minScale)-1:
+            minScale = affines[id(tform)].scale[0]
             minT = tform
             multiMins = []
             
-        elif abs(tform._tform.scale[0])-1 == abs(minScale)-1:
+        elif abs(affines[id(tform)].scale[0])-1 == abs(minScale)-1:
             multiMins.append(tform)
     
-    output = str(minT.tag)
+    output = str(tags[id(minT)])
     for elem in multiMins:
-        output += '\n'+elem.tag
+        output += '\n'+tags[id(elem)]
     print( output+'\nwith a scale of '+ str(minScale) )
     return minScale
 
@@ -1,30 +1,140 @@
 #!/usr/bin/python
 from pyrecon.main import openSeries
-import argparse
+from pyrecon.classes import Series
+from pyrecon.tools import sectionCache, workerPool
+import argparse, cPickle, itertools, os
 
-def main(series, threshold, duplicates=True, distant=True, reverse=True, printOut=True):
+def main(series, threshold, duplicates=True, distant=True, reverse=True, printOut=True, names=None, workers=None,
+	journal=None):
+	'''Runs the selected curation checks on <series>, in one pass over its sections (see curate). If <series> is a
+	path, only Contours matching <names> (regex) are loaded. If a <journal> path is given, only sections changed
+	since the last run with that journal are checked again.'''
 	if type(series) == type(''):
-		series = openSeries(series)
+		series = openSeries(series, names=names)
 	if printOut:
 		print('======================')
 		print('curationTool on %s')%series.name
 		print('======================')
+	checks = {}
+	if duplicates:
+		checks['duplicates'] = DuplicateCheck()
+	if distant:
+		checks['distant'] = DistantCheck(threshold)
+	if reverse:
+		checks['reverse'] = ReverseCheck()
+	found = curate(series, checks, workers, journal=journal)
 	a=''
 	b=''
 	c=''
 	if duplicates:
-		a = findDuplicateTraces(series, printOut=printOut)
+		a = findDuplicateTraces(series, printOut=printOut, duplicateDict=found['duplicates'])
 	if distant:
-		b = findDistantTraces(series, threshold, printOut=printOut)
+		b = findDistantTraces(series, threshold, printOut=printOut, distantDict=found['distant'])
 	if reverse:
-		c = findReverseTraces(series, printOut=printOut)
+		c = findReverseTraces(series, printOut=printOut, reverseDict=found['reverse'])
 	if not printOut:
 		return (a,b,c)
-def findDuplicateTraces(series, printOut=True):
-	'''Prints the duplicates found within every section of <series>'''
+
+# Curation engine
+def curate(series, checks, workers=None, progress=None, journal=None):
+	'''Runs <checks> (dict of name -> check, see ContourCheck) on <series>, visiting each section once, in a pool of
+	<workers> processes (default: CPU count). <progress>(done, total) is called after each section that is checked.
+	Returns dict of name -> the check's series() result.
+	If a <journal> path is given, section() results are saved there with the digests of each section's file and
+	contents (see Section._digest and Section.contentDigest), and sections read from the same file and unchanged in
+	memory since the journal was saved reuse them. Checks spanning sections work from the section() results of every
+	section in series(), so they see the changed sections' neighbors.'''
+	sections = series.sections
+	keys = dict((name, (name, check.__class__.__name__)) for name, check in checks.items()) # journal result keys
+	entries = _loadJournal(journal) if journal is not None else {}
+	# Entries still valid: section index -> {key: section() result}
+	stored = [None]*len(sections)
+	digests = [None]*len(sections)
+	if journal is not None:
+		for i, section in enumerate(sections):
+			entry = entries.get(section.index)
+			digests[i] = (section._digest, section.contentDigest())
+			if (entry is not None and entry['digests'] == digests[i] and
+				all(key in entry['results'] for key in keys.values())):
+				stored[i] = entry
+	todo = [i for i in range(len(sections)) if stored[i] is None]
+	# Workers get the sections when forked and return only contour positions/names (see ContourCheck)
+	found = workerPool.imap(_checkSection, (sections, checks), todo, workers)
+	try:
+		for done, (i, sectionResults) in enumerate(itertools.izip(todo, found)):
+			stored[i] = {'digests':digests[i],
+				'results':dict((keys[name], sectionResults[name]) for name in checks)}
+			if progress is not None:
+				progress(done+1, len(todo))
+	finally:
+		found.close()
+	if journal is not None:
+		for section, entry in zip(sections, stored):
+			entries[section.index] = entry
+		_saveJournal(journal, entries)
+	return dict((name, check.series(series, [entry['results'][keys[name]] for entry in stored]))
+		for name, check in checks.items())
+def _loadJournal(path):
+	'''Returns dict of section index -> journal entry from the curation journal at <path> ({} if there is none).'''
+	if not os.path.exists(path):
+		return {}
+	try:
+		with open(path, 'rb') as f:
+			journal = cPickle.load(f)
+		return journal['sections'] if journal.get('version') == 2 else {}
+	except Exception as e:
+		print('Could not read curation journal %s (%s); checking every section'%(path, e))
+		return {}
+def _saveJournal(path, entries):
+	'''Writes the section index -> entry dict <entries> to the curation journal at <path>.'''
+	sectionCache.atomicWrite(path, lambda f: cPickle.dump({'version':2, 'sections':entries}, f, cPickle.HIGHEST_PROTOCOL))
+def _runChecks(section, checks):
+	'''Returns dict of name -> section() result of each of <checks> on <section>. Contour geometry (Contour.popShape)
+	is cached on the contours, so it is built once for all checks.'''
+	return dict((name, check.section(section)) for name, check in checks.items())
+def _checkSection(job, i):
+	'''Returns _runChecks of the <i>th section, for the (sections, checks) <job> of curate.'''
+	sections, checks = job
+	return _runChecks(sections[i], checks)
+
+class ContourCheck:
+	'''A curation check run by curate(): section() returns the positions of the contours it finds in a Section and
+	series() collects them in a dictionary of section index -> contours. New checks subclass this (or provide
+	section() and series() with picklable section() results).'''
+	def section(self, section):
+		'''Returns positions in <section>.contours of the contours found.'''
+		found = set(id(cont) for cont in self.locate(section))
+		return [i for i, cont in enumerate(section.contours) if id(cont) in found]
+	def locate(self, section):
+		'''Returns the contours found in <section>.'''
+		return []
+	def series(self, series, results):
+		'''Returns dictionary of section index -> contours found, from the section() <results> of <series>.sections.'''
+		return dict((section.index, [section.contours[i] for i in found])
+			for section, found in zip(series.sections, results) if found)
+class DuplicateCheck(ContourCheck):
+	'''Traces that completely overlap another of the same name (see Series.locateDuplicates).'''
+	def locate(self, section):
+		return section.locateDuplicates()
+class ReverseCheck(ContourCheck):
+	'''Reverse traces (see Series.locateReverseTraces).'''
+	def locate(self, section):
+		return section.locateReverseTraces()
+class DistantCheck:
+	'''Traces that reappear after <threshold> sections of non-existence (see Series.locateDistantTraces).'''
+	def __init__(self, threshold=7):
+		self.threshold = threshold
+	def section(self, section):
+		return list(set([cont.name for cont in section.contours]))
+	def series(self, series, results):
+		return Series.distantTraces(results, [self.threshold], int(series.sections[0].index))[self.threshold]
+
+def findDuplicateTraces(series, printOut=True, duplicateDict=None):
+	'''Prints the duplicates found within every section of <series> (or given in <duplicateDict>)'''
 	if type(series) == type(''):
 		series = openSeries(series)
-	duplicateDict = series.locateDuplicates()
+	if duplicateDict is None:
+		duplicateDict = series.locateDuplicates()
 	if printOut:
 		print('--------------------------\n'+'Locating duplicate traces:'+'--------------------------\n')
 		for sec in sorted(duplicateDict):
@@ -45,11 +155,13 @@ def findDuplicateTraces(series, printOut=True):
 			output.append('\n')
 		return output
 
-def findDistantTraces(series, threshold, printOut=True):
-	'''Prints traces of the same name separated by <threshold> sections that do not contain that section'''
+def findDistantTraces(series, threshold, printOut=True, distantDict=None):
+	'''Prints traces of the same name separated by <threshold> sections that do not contain that section (or given in
+	<distantDict>)'''
 	if type(series) == type(''):
 		series = openSeries(series)
-	distantDict = series.locateDistantTraces(threshold)
+	if distantDict is None:
+		distantDict = series.locateDistantTraces(threshold)
 	if printOut:
 		print('-------------------------------------------------\n'+str('Locating distant traces (threshold: +/-%d sections):'%threshold)+'-------------------------------------------------\n')
 		for sec in sorted(distantDict):
@@ -70,11 +182,12 @@ def findDistantTraces(series, threshold, printOut=True):
 			output.append('\n')
 		return output
 
-def findReverseTraces(series, printOut=True):
-	'''Prints all the reverse traces found in a series (per section)'''
+def findReverseTraces(series, printOut=True, reverseDict=None):
+	'''Prints all the reverse traces found in a series (per section, or given in <reverseDict>)'''
 	if type(series) == type(''):
 		series = openSeries(series)
-	reverseDict = series.locateReverseTraces()
+	if reverseDict is None:
+		reverseDict = series.locateReverseTraces()
 	if printOut:
 		print('------------------------\n'+'Locating reverse traces:'+'------------------------\n')
 		for sec in sorted(reverseDict):
@@ -98,8 +211,9 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Performs various functions to assist curating a series')
     parser.add_argument('series', nargs=1, type=str, help='Path to the series/sections that needs to be curated')
     parser.add_argument('threshold', nargs=1, type=int, help='Parameter for findDistantTraces, the number of sections that exist between two traces of the same name that do not contain said trace')
+    parser.add_argument('--journal', type=str, default=None, help='File keeping results between runs, so that only changed sections are checked again')
     args = vars(parser.parse_args())
     # Assign argparse things to their variables
     seriesPath = str(args['series'][0])
     threshold = int(args['threshold'][0])
-    main(seriesPath, threshold)
\ No newline at end of file
+    main(seriesPath, threshold, journal=args['journal'])
\ No newline at end of file
@@ -1,14 +1,14 @@
 #!/usr/bin/python
 # To change what data is shown in the excelWorkbook for each trace type, edit the function: classes.MultiSectionContour.makeSpecific()
-import openpyxl, argparse, os
+import openpyxl, argparse, os, re
 from pyrecon.main import openSeries
 from pyrecon.classes.MultiSectionContour import MultiSectionContour
 from operator import attrgetter
 
 def main(series, save_path):
-    # Load series
+    # Load series (only dendrites, protrusions and their traces are used: d##...)
     if type(series) == type(''):
-        series = openSeries(series)
+        series = openSeries(series, names=re.compile('d[0-9]{2,}', re.I))
     # Output directory
     if save_path[-1] != '/':
         save_path += '/'
@@ -35,7 +35,8 @@ class Workbook(openpyxl.Workbook):
         openpyxl.Workbook.__init__(self)
         
         self.series = series # Series object for this workbook
-        self.objects = series.getObjectLists() # Names of objects in this series
+        self.table = series.measurementTable() # Data of every object, measured in one pass
+        self.objects = series.getObjectLists(self.table['name']) # Names of objects in this series
         self.filterType = ['c'] # Ignore these rTypes
     def listProtrusionChildren(self):
         childList = []
@@ -47,13 +48,13 @@ class Workbook(openpyxl.Workbook):
         '''Gathering protrusions/children from series'''
         protrusions = []
         for protName in self.objects[1]:
-            protrusion = MultiSectionContour(name=protName, series=self.series) #===
+            protrusion = MultiSectionContour(name=protName, series=self.series, table=self.table) #===
             protrusions.append(protrusion)
         self.protrusions = protrusions
     def getDendrites(self):
         dendrites = []
         for dendName in self.objects[0]:
-            dendrite = MultiSectionContour(name=dendName, series=self.series)
+            dendrite = MultiSectionContour(name=dendName, series=self.series, table=self.table)
             dendrites.append(dendrite)
         self.dendrites = dendrites
     def writeProtrusionsPerDendrite(self):
@@ -114,7 +115,7 @@ class Workbook(openpyxl.Workbook):
                         subColumn = column
                         for subChild in prot.children[child]:
                             subColumn = column
-                            subChildObj = MultiSectionContour(name=subChild, series=self.series)
+                            subChildObj = MultiSectionContour(name=subChild, series=self.series, table=self.table)
                             sheet.cell(row=row, column=subColumn).value = subChildObj.name
                             subColumn = column+1
                             for data_item in subChildObj.data:
@@ -1,20 +1,32 @@
 '''Functions for reading from/writing to RECONSTRUCT XML files.'''
 from pyrecon.classes import Contour, Image, Section, Series, Transform, ZContour
+from pyrecon.classes.Transform import transformKey
 from lxml import etree as ET # lxml parsing library Element Tree module
+import numpy as np
 import os, re
 # Process Files
-def process(path, obj=False):
-    '''Process XML file defined by path'''
+def process(path, obj=False, names=None, arrays=False, transforms=None):
+    '''Process XML file defined by path. For Sections, <names> (regex) limits which Contours are loaded.
+    If <arrays>, Contour points are (N, 2) numpy arrays instead of lists of tuples. Transforms are taken from the
+    <transforms> table (see internTransform) if given.'''
+    if rootTag(path) == 'Section': # Process Section (streamed)
+        if obj:
+            return Section(*processSectionStream(path, names, arrays, transforms))
+        return processSectionStream(path, names, arrays, transforms)
     tree = ET.parse(path)
     root = tree.getroot()
     if root.tag == 'Section': # Process Section
         if obj:
-            return Section(*processSectionFile(tree))
-        return processSectionFile(tree)
+            return Section(*processSectionFile(tree, names, arrays, transforms))
+        return processSectionFile(tree, names, arrays, transforms)
     elif root.tag == 'Series': # Process Series
         if obj:
             return Series(*processSeriesFile(tree))
         return processSeriesFile(tree)
+def rootTag(path):
+    '''Returns the tag of the root element of the XML file at <path> without parsing the rest of the file.'''
+    for event, elem in ET.iterparse(path, events=('start',)):
+        return elem.tag
 def processSeriesFile(tree):
     root = tree.getroot()
     attributes = seriesAttributes(root)
@@ -32,21 +44,36 @@ def processSeriesFile(tree):
                 zcontours = []
             zcontours.append(zcontour)
     return attributes, contours, zcontours
-def processSectionFile(tree):
-    '''Returns attribute dictionary, image object, and contour list associated with a Section's XML <tree>'''
+def internTransform(attributes, transforms=None):
+    '''Returns a Transform of <attributes> (dim, xcoef, ycoef). If a <transforms> table (transformKey -> Transform)
+    is given, an equal Transform already in it is returned instead of building a new one, and new ones are added.'''
+    if transforms is None:
+        return Transform(attributes)
+    key = transformKey(attributes['dim'], attributes['xcoef'], attributes['ycoef'])
+    if key not in transforms:
+        transforms[key] = Transform(attributes)
+    return transforms[key]
+def processSectionFile(tree, names=None, arrays=False, transforms=None):
+    '''Returns attribute dictionary, image object, and contour list associated with a Section's XML <tree>.
+    If <names> (regex) is given, only Contours whose name matches it (and the domain1 image contour) are loaded.'''
+    if isinstance(names, basestring):
+        names = re.compile(names)
     root = tree.getroot()
     attributes = sectionAttributes(root)
     # Process images and contours
     images = []
     contours = None
     for transform in root:
-        tForm = Transform( transformAttributes(transform) )
+        tForm = internTransform( transformAttributes(transform), transforms )
         for child in transform:
             if child.tag == 'Image':
                 img = Image( imageAttributes(child), tForm )
                 images.append(img)
             elif child.tag == 'Contour':
-                cont = Contour( contourAttributes(child), tForm)
+                if (names is not None and child.get('name') != 'domain1' and
+                    not names.match(child.get('name'))):
+                    continue # skip before parsing attributes
+                cont = Contour( sectionContourAttributes(child, arrays, attributes['index']), tForm)
                 cont.section = attributes['index']
                 if contours == None:
                     contours = []
@@ -57,12 +84,97 @@ def processSectionFile(tree):
     except:
         image = None
     # Connect 'domain1' contour with section image
-    for contour in contours:
+    for contour in contours or []:
+        if contour.name == 'domain1':
+            contour.image = image
+    return attributes, image, contours
+def iterSectionFile(path, names=None, arrays=False, transforms=None):
+    '''Streams the Section XML file at <path>: yields its attribute dictionary, then each Image and Contour object as
+    its element closes. Consumed elements are cleared, so memory use does not grow with the size of the file.
+    If <names> (regex) is given, only Contours whose name matches it (and the domain1 image contour) are yielded.'''
+    if isinstance(names, basestring):
+        names = re.compile(names)
+    attributes = None
+    tForm = None
+    image = None
+    skip = False
+    for event, elem in ET.iterparse(path, events=('start','end')):
+        if event == 'start':
+            if elem.tag == 'Section':
+                attributes = sectionAttributes(elem)
+                yield attributes
+            elif elem.tag == 'Transform':
+                tForm = internTransform( transformAttributes(elem), transforms )
+            elif elem.tag == 'Contour':
+                skip = (names is not None and elem.get('name') != 'domain1' and
+                        not names.match(elem.get('name'))) # skip before parsing attributes
+            continue
+        if elem.tag == 'Image':
+            image = Image( imageAttributes(elem), tForm )
+            yield image
+        elif elem.tag == 'Contour':
+            if not skip:
+                cont = Contour( sectionContourAttributes(elem, arrays, attributes['index']), tForm)
+                cont.section = attributes['index']
+                if cont.name == 'domain1':
+                    cont.image = image
+                yield cont
+        elif elem.tag != 'Transform':
+            continue
+        # Free consumed elements
+        elem.clear()
+        if elem.tag == 'Transform':
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+def iterContours(path, names=None):
+    '''Yields the Contour objects of the Section XML file at <path> as they are parsed (see iterSectionFile).'''
+    for item in iterSectionFile(path, names):
+        if item.__class__.__name__ == 'Contour':
+            yield item
+def processSectionStream(path, names=None, arrays=False, transforms=None):
+    '''Returns attribute dictionary, image object, and contour list of the Section XML file at <path>, parsed with
+    iterSectionFile. Equivalent to processSectionFile(ET.parse(path), names) without holding the whole tree.'''
+    attributes = None
+    images = []
+    contours = None
+    for item in iterSectionFile(path, names, arrays, transforms):
+        if type(item) == type({}):
+            attributes = item
+        elif item.__class__.__name__ == 'Image':
+            images.append(item)
+        elif item.__class__.__name__ == 'Contour':
+            if contours == None:
+                contours = []
+            contours.append(item)
+    # Get first image from images list
+    try:
+        image = images.pop()
+    except:
+        image = None
+    # Connect 'domain1' contour with section image
+    for contour in contours or []:
         if contour.name == 'domain1':
             contour.image = image
     return attributes, image, contours
 # Process attributes from tree nodes
-def contourAttributes(node):
+class PointsError(ValueError):
+    '''Raised for a points attribute that is not a list of (x, y) numbers.'''
+def pointsArray(points, dtype=float):
+    '''Returns an (N, 2) array of the values in a points attribute ("x1 y1, x2 y2, ..."), parsed in a single pass.'''
+    text = points.replace(',',' ')
+    values = np.fromstring(text, dtype=np.float64, sep=' ')
+    if len(values) != len(text.split()): # fromstring stops at the first value it cannot read
+        raise PointsError('Malformed points: '+points)
+    if len(values)%2 != 0:
+        raise PointsError('Odd number of values in points: '+points)
+    values = values.reshape((-1, 2))
+    if dtype == int: # Series contours have integer points
+        if (values != np.floor(values)).any():
+            raise PointsError('Non-integer points: '+points)
+        values = values.astype(int)
+    return values
+def contourAttributes(node, arrays=False):
+    '''Returns a dict of the Contour attributes in <node>; points are a numpy array if <arrays>.'''
     try: # Contours in Sections
         attributes = {}
         attributes['name'] = str(node.get('name'))
@@ -73,8 +185,14 @@ def contourAttributes(node):
         attributes['mode'] = int(node.get('mode'))
         attributes['border'] = tuple(float(x) for x in node.get('border').strip().split(' '))
         attributes['fill'] = tuple(float(x) for x in node.get('fill').strip().split(' '))
-        attributes['points'] = zip([float(x.replace(',','')) for x in node.get('points').split()][0::2], [float(x.replace(',','')) for x in node.get('points').split()][1::2])
+        try:
+            points = pointsArray(node.get('points'))
+        except PointsError as e:
+            raise PointsError('Contour %s: %s'%(attributes['name'], e))
+        attributes['points'] = points if arrays else map(tuple, points.tolist())
         attributes['coordSys'] = 'bio'
+    except PointsError:
+        raise
     except: # Contours in Series
         try:
             attributes = {}
@@ -83,11 +201,23 @@ def contourAttributes(node):
             attributes['mode'] = int(node.get('mode'))
             attributes['border'] = tuple(float(x) for x in node.get('border').strip().split(' '))
             attributes['fill'] = tuple(float(x) for x in node.get('fill').strip().split(' '))
-            attributes['points'] = zip([int(x.replace(',','')) for x in node.get('points').split()][0::2], [int(x.replace(',','')) for x in node.get('points').split()][1::2])
+            try:
+                points = pointsArray(node.get('points'), int)
+            except PointsError as e:
+                raise PointsError('Contour %s: %s'%(attributes['name'], e))
+            attributes['points'] = points if arrays else map(tuple, points.tolist())
             attributes['coordSys'] = 'bio'
+        except PointsError:
+            raise
         except:
             print('Problem retrieving contourAttributes')
     return attributes
+def sectionContourAttributes(node, arrays, index):
+    '''Returns contourAttributes(<node>, <arrays>) of a contour in the Section numbered <index>.'''
+    try:
+        return contourAttributes(node, arrays)
+    except PointsError as e:
+        raise PointsError('Section %d: %s'%(index, e))
 def imageAttributes(node):
     attributes = {}
     attributes['src'] = str(node.get('src'))
@@ -219,6 +349,11 @@ def zContourAttributes(node):
     attributes['points'] = [(float(x.split(' ')[0]), float(x.split(' ')[1]), int(x.split(' ')[2])) for x in [x.strip() for x in node.get('points').split(',')] if len(tuple(float(x) for x in x.split(' ') if x != '')) == 3]
     return attributes
 # Write objects to XML
+def pointsList(points):
+    '''Returns <points> as a list of (x, y) Python numbers, so that array points are written like list points.'''
+    if isinstance(points, np.ndarray):
+        return points.tolist()
+    return points
 def objectToElement(object):
     '''Returns an ElementTree Element for <object> that is appropriate for writing to an XML file.'''
     def contourToElement(contour):
@@ -231,7 +366,7 @@ def objectToElement(object):
                                  border=str(contour.border[0])+' '+str(contour.border[1])+' '+str(contour.border[2]),
                                  fill=str(contour.fill[0])+' '+str(contour.fill[1])+' '+str(contour.fill[2]),
                                  mode=str(contour.mode),
-                                 points= ', '.join([str(pt[0])+' '+str(pt[1]) for pt in contour.points])+','
+                                 points= ', '.join([str(pt[0])+' '+str(pt[1]) for pt in pointsList(contour.points)])+','
             )
         except:
             try: # Contour in Series
@@ -241,7 +376,7 @@ def objectToElement(object):
                                      border=str(contour.border[0])+' '+str(contour.border[1])+' '+str(contour.border[2]),
                                      fill=str(contour.fill[0])+' '+str(contour.fill[1])+' '+str(contour.fill[2]),
                                      mode=str(contour.mode),
-                                     points= ', '.join([str(pt[0])+' '+str(pt[1]) for pt in contour.points])+','
+                                     points= ', '.join([str(pt[0])+' '+str(pt[1]) for pt in pointsList(contour.points)])+','
                 )
             except:
                 print('Problem creating Contour element', contour.name)
@@ -377,6 +512,8 @@ def objectToElement(object):
         return imageToElement(object)
     elif object.__class__.__name__ == 'Section':
         return sectionToElement(object)
+    elif object.__class__.__name__ == 'SectionProxy':
+        return sectionToElement(object.section())
     elif object.__class__.__name__ == 'Series':
         return seriesToElement(object)
     elif object.__class__.__name__ == 'Transform':
@@ -384,8 +521,11 @@ def objectToElement(object):
     elif object.__class__.__name__ == 'ZContour':
         return zcontourToElement(object)
 def writeSection(section, directory, outpath=None, overwrite=False):
-    '''Writes <section> to an XML file in directory'''
+    '''Writes <section> to an XML file in directory. Returns False (and writes nothing) if the file exists and not
+    <overwrite>, True otherwise.'''
     print 'Writing section:',section.name
+    if section.__class__.__name__ == 'SectionProxy':
+        section = section.section()
     if not outpath: # Will write to file with sections name
         if str(directory[-1]) != '/':
             directory += '/'
@@ -401,31 +541,34 @@ def writeSection(section, directory, outpath=None, overwrite=False):
     #Append image node to root
     root.append(imageTransform)
     # Contours and Transforms
-    # - Build list of unique Transform objects
-    uniqueTransforms = []
+    # - Group contours by equal (==) Transform, in order of first appearance
+    uniqueTransforms = [] # (Transform, contours)
+    groups = {} # (dim, xcoef, ycoef) -> contours
+    keys = {} # id(Transform) -> (dim, xcoef, ycoef)
     for contour in section.contours:
         if contour.name != 'domain1': # ignore image contour
-            unique = True
-            for tform in uniqueTransforms:
-                if tform == contour.transform:
-                    unique = False
-                    break
-            if unique:
-                uniqueTransforms.append(contour.transform)
+            tform = contour.transform
+            if id(tform) not in keys:
+                keys[id(tform)] = (tform.dim, tuple(tform.xcoef), tuple(tform.ycoef))
+            key = keys[id(tform)]
+            if key not in groups:
+                groups[key] = []
+                uniqueTransforms.append((tform, groups[key]))
+            groups[key].append(contour)
     # - Add contours to their equivalent Transform objects
-    for transform in uniqueTransforms:
+    for transform, contours in uniqueTransforms:
         transformElement = objectToElement(transform)
-        for contour in section.contours:
-            if contour.name != 'domain1' and contour.transform == transform:
-                cont = objectToElement(contour)
-                transformElement.append(cont)
+        for contour in contours:
+            cont = objectToElement(contour)
+            transformElement.append(cont)
         root.append(transformElement)
     # Make tree and write
     elemtree = ET.ElementTree(root)
     if os.path.exists(outpath) and not overwrite:
         print('Section write aborted (%s) due to overwrite conflict.'%(section.name))
-        return
+        return False
     elemtree.write(outpath, pretty_print=True, xml_declaration=True, encoding="UTF-8")
+    return True
 def writeSeries(series, directory, outpath=None, sections=False, overwrite=False):
     '''Writes <series> to an XML file in directory'''
     print 'Writing series:',series.name
@@ -181,6 +181,10 @@ class ContourGraph:
 
     @classmethod
     def fromSeriesAndRegexp(cls, series, regexp):
+        # If given a path, only load the Contours that match regexp
+        if isinstance(series, basestring):
+            from pyrecon.main import openSeries
+            series = openSeries(series, names=regexp)
         contourDict = series.getContours(regexp)
         contourGraphs = [cls(contours) for contours in contourDict.values()]
         return contourGraphs
@@ -1,18 +1,237 @@
-from pyrecon.classes import Series, Section
+from pyrecon.classes import Contour, Series, Section
 from pyrecon.tools import handleXML as xml
+from pyrecon.tools import sectionCache, workerPool
+from shapely.geometry import box
+import numpy as np
+import cPickle, os
+try:
+	from shapely.strtree import STRtree
+except ImportError: # Old shapely: bounds are compared directly
+	STRtree = None
 
-def createMergeSet(series1, series2):
-	'''This function takes in two Series objects and returns a MergeSet to be used for the mergeTool'''
-
-	mSer = MergeSeries(series1, series2)
-	mSecs = []
+def createMergeSet(series1, series2, workers=None, progress=None, categories=None, base=None, skipIdentical=True):
+	'''This function takes in two Series objects and returns a MergeSet to be used for the mergeTool. Section
+	contours are categorized in a pool of <workers> processes (default: CPU count). <progress>(done, total) is called
+	after each section. <categories> optionally gives each section's MergeSection.categories() (None: compute).
+	If a <base> Series (common ancestor of both) is given, the merge is three-way: whatever changed on only one side
+	since <base> is taken from that side (see MergeSection.checkConflictsThreeWay). If <skipIdentical>, sections that
+	were read from files with the same contents in both series (the sha1 recorded when each was loaded is compared,
+	not the files now on disk) and whose contours still have the same geometry in the same order are resolved without
+	categorizing their contours.'''
+	mSer = MergeSeries(series1, series2, base=base)
 	for i in range( len(series1.sections) ):
-		if series1.sections[i].index == series2.sections[i].index:
-			mSecs.append( MergeSection(series1.sections[i],series2.sections[i]) )
-		else:
+		if series1.sections[i].index != series2.sections[i].index:
 			raise Exception('Series do not have matching section indeces! Aborting createMergeSet()!')
 			return
+	baseSections = dict((section.index, section) for section in base.sections) if base is not None else {}
+	pairs = [(section1, section2, baseSections.get(section1.index))
+		for section1, section2 in zip(series1.sections, series2.sections)] # (section1, section2, base section)
+	categories = list(categories) if categories is not None else [None]*len(pairs)
+	if skipIdentical:
+		for i, (section1, section2, baseSection) in enumerate(pairs):
+			if categories[i] is None and _identicalSections(section1, section2):
+				categories[i] = ([], [], [(j, j) for j in range(len(section1.contours))], []) # Each contour matches its copy
+	todo = [i for i in range(len(pairs)) if categories[i] is None]
+	# Workers get the sections when forked and return only contour indices (see MergeSection categories)
+	results = workerPool.imap(_categorizeSection, pairs, todo, workers)
+	mSecs = []
+	try:
+		for i, (section1, section2, baseSection) in enumerate(pairs):
+			if categories[i] is None:
+				categories[i] = results.next() # (results come in order of todo)
+			mSecs.append( MergeSection(section1, section2, categories=categories[i], base=baseSection) )
+			if progress is not None:
+				progress(len(mSecs), len(pairs))
+	finally:
+		results.close()
 	return MergeSet( mSer, mSecs )
+def _categorizeSection(pairs, i):
+	'''Returns MergeSection.categories() of the <i>th of the (section1, section2, base section) <pairs>.'''
+	section1, section2, baseSection = pairs[i]
+	return MergeSection(section1, section2, base=baseSection).categories()
+
+JOURNAL_VERSION = 2 # Format of the journals written by MergeSet.save
+def loadMergeSet(path, series1=None, series2=None, workers=None, progress=None, base=None):
+	'''Returns the MergeSet saved to the journal at <path> (see MergeSet.save), with its resolutions restored. The
+	Series (and <base> Series of a three-way merge) are opened from the paths in the journal unless given. Only
+	sections read from files with other contents than when the journal was saved (see Section._digest) are
+	re-categorized (in <workers> processes, see createMergeSet); their resolutions are dropped. Raises ValueError
+	for journals of another format version.'''
+	with open(path, 'rb') as f:
+		journal = cPickle.load(f)
+	version = journal.get('version') if type(journal) == type({}) else None
+	if version != JOURNAL_VERSION:
+		raise ValueError('Cannot load merge journal %s: format version %r, expected %d'%(path, version, JOURNAL_VERSION))
+	basePath = journal.get('base')
+	if series1 is None or series2 is None or (base is None and basePath is not None):
+		from pyrecon.main import openSeries
+		series1 = series1 or openSeries(journal['series'][0])
+		series2 = series2 or openSeries(journal['series'][1])
+		if base is None and basePath is not None:
+			base = openSeries(basePath)
+	baseSections = dict((section.index, section) for section in base.sections) if base is not None else {}
+	entries = dict((entry['index'], entry) for entry in journal['sectionMerges'])
+	unchanged = []
+	for section1, section2 in zip(series1.sections, series2.sections):
+		entry = entries.get(section1.index)
+		baseSection = baseSections.get(section1.index)
+		unchanged.append(entry is not None and
+			entry['counts'] == (len(section1.contours), len(section2.contours)) and
+			entry.get('digests') == (section1._digest, section2._digest,
+				baseSection._digest if baseSection is not None else None) and
+			None not in entry['digests'][:2])
+	categories = [entries[s.index]['categories'] if same else None for s, same in zip(series1.sections, unchanged)]
+	mergeSet = createMergeSet(series1, series2, workers, progress, categories, base)
+	for mergeSection, same in zip(mergeSet.sectionMerges, unchanged):
+		if same:
+			mergeSection.restore(entries[mergeSection.section1.index])
+	entry = journal['seriesMerge']
+	if (entry.get('digests') == (series1._digest, series2._digest, base._digest if base is not None else None) and
+		None not in entry['digests'][:2]):
+		mergeSet.seriesMerge.restore(entry)
+	return mergeSet
+# Journal helpers
+def _identicalSections(section1, section2):
+	'''Returns true if <section1> and <section2> were read from files with the same contents (see Section._digest)
+	and their contours still match one to one, in order (see Contour.geometryKey and contourAttributes).'''
+	if section1._digest is None or section1._digest != section2._digest:
+		return False
+	if len(section1.contours) != len(section2.contours):
+		return False
+	return all(contour1.geometryKey() == contour2.geometryKey() and
+		contourAttributes(contour1) == contourAttributes(contour2)
+		for contour1, contour2 in zip(section1.contours, section2.contours))
+def _refs(objects, a, b):
+	'''Encodes <objects> (a list, or None) as ('A', i)/('B', j) for items of list <a>/<b>, other items as ('obj', item).'''
+	if objects is None:
+		return None
+	positions = dict((id(obj), ('B', j)) for j, obj in enumerate(b))
+	positions.update((id(obj), ('A', i)) for i, obj in enumerate(a))
+	return [positions.get(id(obj), ('obj', obj)) for obj in objects]
+def _derefs(refs, a, b):
+	'''Decodes the output of _refs.'''
+	if refs is None:
+		return None
+	return [a[i] if side == 'A' else b[i] if side == 'B' else i for side, i in refs]
+def _attributesRef(attributes, a, b):
+	'''Encodes resolved <attributes> as 'A'/'B' if they are those of <a>/<b>.'''
+	if attributes is not None and attributes == a.attributes():
+		return 'A'
+	elif attributes is not None and attributes == b.attributes():
+		return 'B'
+	return attributes
+def _attributesDeref(ref, a, b):
+	return a.attributes() if ref == 'A' else b.attributes() if ref == 'B' else ref
+
+def overlapCandidates(contoursA, contoursB, sameName=True):
+	'''Returns, for each contour in <contoursA>, the sorted indices of the contours in <contoursB> whose world bounds
+	intersect or touch its own (only those pairs can overlap, see Contour.overlaps); only contours with the same name
+	if <sameName>. Contours without a shape (see Contour.popShape) have no candidates.'''
+	for contour in contoursA+contoursB:
+		contour.popShape()
+	# Bucket contoursB by name (one bucket if not sameName)
+	buckets = {} # key -> [indices into contoursB]
+	for j, contB in enumerate(contoursB):
+		if contB.shape is not None:
+			buckets.setdefault(contB.name if sameName else None, []).append(j)
+	indexes = {} # key -> (indices, bounds array, STRtree or None, id(box) -> position in indices)
+	candidates = []
+	for contA in contoursA:
+		key = contA.name if sameName else None
+		if contA.shape is None or key not in buckets:
+			candidates.append([])
+			continue
+		if key not in indexes: # Build spatial index of bucket on first use
+			indices = buckets[key]
+			bounds = np.array([contoursB[j].bounds() for j in indices])
+			tree, positions = None, None
+			if STRtree is not None and len(indices) > 1:
+				boxes = [box(*b) for b in bounds.tolist()]
+				tree = STRtree(boxes)
+				positions = dict((id(b), k) for k, b in enumerate(boxes))
+			indexes[key] = (indices, bounds, tree, positions)
+		indices, bounds, tree, positions = indexes[key]
+		minx, miny, maxx, maxy = contA.bounds()
+		if tree is not None:
+			hits = tree.query(box(minx, miny, maxx, maxy))
+			hits = [positions[id(hit)] if id(hit) in positions else int(hit) for hit in hits] # geometries or indices
+		else:
+			hits = range(len(indices))
+		# Exact bounds test (the same as Contour.overlaps')
+		candidates.append(sorted(indices[k] for k in hits
+			if not (minx > bounds[k,2] or bounds[k,0] > maxx or miny > bounds[k,3] or bounds[k,1] > maxy)))
+	return candidates
+
+def threeWay(a, base, b):
+	'''Returns whichever of <a> and <b> changed since <base> if only one did, <a> if they are equal, else None
+	(conflict).'''
+	if a == base:
+		return b
+	elif b == base or a == b:
+		return a
+	return None
+def contourAttributes(contour):
+	'''Returns the fields of <contour> other than its geometry (see Contour.geometryKey), including the comment and
+	hidden flag that Contour.__eq__ ignores, for threeWay comparison of exactly matched contours.'''
+	return tuple(getattr(contour, key) for key in Contour._eqFields+('comment', 'hidden'))
+def categorizeContours(contoursA, contoursB, threshold=(1+2**(-17)), sameName=True, overlaps=False):
+	'''Returns lists of mutually overlapping contours between two lists of contours (see
+	MergeSection.getCategorizedContours).'''
+	compOvlps = [] # Pairs of completely (within threshold) overlapping contours 
+	confOvlps = [] # Pairs of incompletely overlapping contours
+
+	# Compute overlaps (only between contours whose bounds meet, see overlapCandidates)
+	OvlpsA = [] # contoursA that have ovlps in contoursB
+	OvlpsB = [] # contoursB that have ovlps in contoursA
+	candidates = overlapCandidates(contoursA, contoursB, sameName)
+	keys = {} # id(contour) -> Contour.geometryKey()
+	def geometryKey(contour):
+		if id(contour) not in keys:
+			keys[id(contour)] = contour.geometryKey()
+		return keys[id(contour)]
+	for contA, indices in zip(contoursA, candidates):
+		ovlpA = []
+		ovlpB = []
+		for contB in [contoursB[j] for j in indices]:
+			if (geometryKey(contA) == geometryKey(contB) and
+				(not contA.closed or contA.shape.area > 0)):
+				overlap = 1 # Identical copies: complete overlap, no need for shapely union/intersection
+			else:
+				overlap = contA.overlaps(contB, threshold)
+			# If sameName: only check contours with the same name
+			if (sameName and
+				contA.name == contB.name and
+				overlap != 0):
+				ovlpA.append(contA)
+				ovlpB.append(contB)
+				if overlaps:
+					if overlap == 1:
+						compOvlps.append([contA,contB])
+					elif overlap > 0: # Conflicting (non-100%) overlap
+						confOvlps.append([contA,contB])
+			# If not sameName: check all contours, regardless of same name
+			elif not sameName and overlap != 0:
+				ovlpA.append(contA)
+				ovlpB.append(contB)
+				if overlaps:
+					if overlap:
+						compOvlps.append([contA,contB])
+					elif overlap > 0: # Conflicting (non-100%) overlap
+						confOvlps.append([contA,contB])
+		OvlpsA.extend(ovlpA)
+		OvlpsB.extend(ovlpB)
+
+	OvlpsA = set(OvlpsA) # (Contour.__hash__ agrees with ==, as list membership used)
+	OvlpsB = set(OvlpsB)
+	if overlaps:
+		# Return unique conts from section1, unique conts from section2, completely overlapping contours, and incompletely overlapping contours
+		return (
+			[cont for cont in contoursA if cont not in OvlpsA],
+			[cont for cont in contoursB if cont not in OvlpsB],
+			compOvlps, confOvlps )
+	else:
+		return ([cont for cont in contoursA if cont not in OvlpsA],
+			[cont for cont in contoursB if cont not in OvlpsB])
 
 class MergeSet:
 	'''This class takes in a MergeSeries object and a list(MergeSection objects).'''
@@ -50,6 +269,55 @@ class MergeSet:
 			mergedSeries.sections.append(mergeSec.toSection())
 		xml.writeSeries(mergedSeries, outpath, sections=True)
 		print 'Done!' #===
+	def streamMergeSet(self, outpath, free=True, overwrite=False):
+		'''Writes self.seriesMerge and self.sectionMerges to XML like writeMergeSet, one section at a time: each merged
+		section is built, written and (if <free>) its source sections released before the next, so only about two
+		sections are held in memory. Sections already written by writeDoneSections are skipped. Unless <overwrite>,
+		writeSeries asks before replacing an existing .ser file (and then its sections), and other existing section
+		files raise an IOError before anything is written.'''
+		mergedSeries = self.seriesMerge.toSeries()
+		mergedSeries.name = self.seriesMerge.name.replace('.ser','')
+		if outpath[-1] != '/':
+			outpath += '/'
+		if not overwrite and not os.path.exists(outpath+mergedSeries.name+'.ser'):
+			existing = [mergeSec.name for mergeSec in self.sectionMerges
+				if not mergeSec.written and os.path.exists(outpath+mergeSec.name)]
+			if existing:
+				raise IOError('Section files already exist in %s: %s'%(outpath, ', '.join(existing)))
+		overwrite = overwrite or os.path.exists(outpath+mergedSeries.name+'.ser') # writeSeries asks before overwriting
+		xml.writeSeries(mergedSeries, outpath, overwrite=overwrite)
+		for mergeSec in self.sectionMerges:
+			if not mergeSec.written and not self.writeMergeSection(mergeSec, outpath, overwrite, free):
+				raise IOError('Could not write section %s to %s'%(mergeSec.name, outpath))
+		print 'Done!' #===
+	def writeDoneSections(self, outpath, overwrite=False, free=True):
+		'''Writes the merged section of each MergeSection that is done (see MergeSection.isDone) and not yet written
+		to <outpath>, releasing its source sections if <free>. Can be called as conflicts are resolved; returns the
+		number of sections written. (Sections whose file exists are not written unless <overwrite>.)'''
+		written = 0
+		for mergeSec in self.sectionMerges:
+			if not mergeSec.written and mergeSec.isDone():
+				if self.writeMergeSection(mergeSec, outpath, overwrite, free):
+					written += 1
+		return written
+	def writeMergeSection(self, mergeSec, outpath, overwrite=False, free=True):
+		'''Writes the merged section of <mergeSec> to <outpath>, then releases its source sections if <free>. Returns
+		False, keeping the sections, if the file exists and not <overwrite> (see handleXML.writeSection).'''
+		if not xml.writeSection(mergeSec.toSection(), outpath, overwrite=overwrite):
+			return False
+		mergeSec.written = True
+		if free:
+			mergeSec.free()
+		return True
+	def save(self, path):
+		'''Saves contour categories, resolutions and source file digests to a journal file at <path>, from which
+		loadMergeSet resumes the merge.'''
+		journal = {'version':JOURNAL_VERSION,
+			'series':(self.seriesMerge.series1.path, self.seriesMerge.series2.path),
+			'base':self.seriesMerge.base.path if self.seriesMerge.base is not None else None,
+			'seriesMerge':self.seriesMerge.journal(),
+			'sectionMerges':[mergeSec.journal() for mergeSec in self.sectionMerges]}
+		sectionCache.atomicWrite(path, lambda f: cPickle.dump(journal, f, cPickle.HIGHEST_PROTOCOL))
 class MergeSection:
 	'''This class manages data about two Section objects that are undergoing a merge.'''
 	def __init__(self, *args, **kwargs):
@@ -67,15 +335,25 @@ class MergeSection:
 		self.uniqueB = None
 		self.compOvlps = None
 		self.confOvlps = None
+		self.written = False # Merged section has been written (see MergeSet.writeDoneSections)
 
 		# Process arguments
+		categories = kwargs.pop('categories', None) # Contour categories computed elsewhere (see self.categories())
+		self.base = kwargs.pop('base', None) # Section both sections derive from, for a three-way merge
+		if self.base.__class__.__name__ == 'SectionProxy':
+			self.base = self.base.section()
 		self.processArguments(args, kwargs)
-		self.checkConflicts()
+		if self.base is not None:
+			self.checkConflictsThreeWay(categories)
+		else:
+			self.checkConflicts(categories)
 
 	# Argument processing
 	def processArguments(self, args, kwargs):
 		'''Process given arguments.'''
 		for arg in args:
+			if arg.__class__.__name__ == 'SectionProxy': # Hold the Section (contours are referred to by position)
+				arg = arg.section()
 			# Section object
 			if arg.__class__.__name__ == 'Section':
 				if not self.section1:
@@ -88,8 +366,9 @@ class MergeSection:
 		for kwarg in kwargs:
 			print kwarg+':',kwargs[kwarg] #===
 
-	def checkConflicts(self):
-		'''Automatically sets merged stuff if they are equivalent'''
+	def checkConflicts(self, categories=None):
+		'''Automatically sets merged stuff if they are equivalent. Contours are categorized by
+		getCategorizedContours, unless the <categories> (see self.categories()) are given.'''
 		# Are attributes equivalent?
 		if self.section1.attributes() == self.section2.attributes():
 			self.attributes = self.section1.attributes()
@@ -97,14 +376,117 @@ class MergeSection:
 		if self.section1.image == self.section2.image:
 			self.images = self.section1.image
 		# Are contours equivalent?
-		separatedConts = self.getCategorizedContours(overlaps=True)
-		self.uniqueA = separatedConts[0]
-		self.uniqueB = separatedConts[1]
-		self.compOvlps = separatedConts[2]
-		self.confOvlps = separatedConts[3]
+		if categories is None:
+			categories = self.getCategorizedContours(overlaps=True)
+			self.uniqueA, self.uniqueB, self.compOvlps, self.confOvlps = categories
+		else:
+			self.setCategories(categories)
 		if (len(self.uniqueA+self.uniqueB) == 0 and 
 			len(self.confOvlps) == 0):
 			self.contours = self.section1.contours
+	def checkConflictsThreeWay(self, categories=None):
+		'''checkConflicts for a three-way merge: attributes, image and contours that changed since self.base on only
+		one side are taken from that side. Contours are matched exactly (Contour.geometryKey); those added on both
+		sides are categorized against each other, those deleted on either side are left out of every category. A
+		matched contour whose other attributes (color, comment, ...) changed only in section2 is taken from section2
+		(as if deleted in section1 and added in section2), one changed on both sides is a conflicting overlap.
+		Contours are resolved unless there are conflicting overlaps.'''
+		self.attributes = threeWay(self.section1.attributes(), self.base.attributes(), self.section2.attributes())
+		self.images = threeWay(self.section1.image, self.base.image, self.section2.image)
+		if categories is None:
+			categories = self.getThreeWayCategories()
+		self.setCategories(categories)
+		if len(self.confOvlps) == 0:
+			chosenA = set(categories[0]) | set(i for i, j in categories[2])
+			self.contours = ([cont for i, cont in enumerate(self.section1.contours) if i in chosenA]+
+				self.uniqueB)
+	def getThreeWayCategories(self):
+		'''Returns self.categories() for a three-way merge (see checkConflictsThreeWay).'''
+		contsA, contsB = self.section1.contours, self.section2.contours
+		keysA = [cont.geometryKey() for cont in contsA]
+		keysB = [cont.geometryKey() for cont in contsB]
+		inBase = {} # geometryKey -> copies in self.base not yet matched
+		for cont in self.base.contours:
+			inBase.setdefault(cont.geometryKey(), []).append(cont)
+		positionsB = {} # geometryKey -> section2 positions not yet matched
+		for j, key in enumerate(keysB):
+			positionsB.setdefault(key, []).append(j)
+		kept = [] # (i, j) whose attributes are unchanged or changed only in section1
+		changedB = [] # j whose attributes changed only in section2
+		changed = [] # (i, j) whose attributes changed on both sides
+		addedA = [] # positions in section1 of contours not in base
+		for i, key in enumerate(keysA):
+			if inBase.get(key):
+				baseCont = inBase[key].pop(0)
+				if positionsB.get(key):
+					j = positionsB[key].pop(0)
+					attributes = [contourAttributes(cont) for cont in (contsA[i], baseCont, contsB[j])]
+					if attributes[0] == attributes[2] or attributes[2] == attributes[1]:
+						kept.append((i, j))
+					elif attributes[0] == attributes[1]:
+						changedB.append(j)
+					else:
+						changed.append((i, j))
+				# else: deleted in section2
+			else:
+				addedA.append(i)
+		addedB = []
+		for j, key in enumerate(keysB):
+			if j not in positionsB.get(key, []):
+				continue # kept
+			if inBase.get(key): # deleted in section1
+				inBase[key].pop(0)
+			else:
+				addedB.append(j)
+		# Contours added on both sides: categorize against each other
+		uniqueA, uniqueB, compOvlps, confOvlps = categorizeContours(
+			[contsA[i] for i in addedA], [contsB[j] for j in addedB], overlaps=True)
+		positionsA = dict((id(contsA[i]), i) for i in addedA)
+		positionsB = dict((id(contsB[j]), j) for j in addedB)
+		return ([positionsA[id(cont)] for cont in uniqueA],
+			changedB+[positionsB[id(cont)] for cont in uniqueB],
+			kept+[(positionsA[id(a)], positionsB[id(b)]) for a, b in compOvlps],
+			changed+[(positionsA[id(a)], positionsB[id(b)]) for a, b in confOvlps])
+	def setCategories(self, categories):
+		'''Sets self.uniqueA, self.uniqueB, self.compOvlps and self.confOvlps from <categories> (see
+		self.categories()).'''
+		contsA, contsB = self.section1.contours, self.section2.contours
+		uniqueA, uniqueB, compOvlps, confOvlps = categories
+		self.uniqueA = [contsA[i] for i in uniqueA]
+		self.uniqueB = [contsB[j] for j in uniqueB]
+		self.compOvlps = [[contsA[i],contsB[j]] for i, j in compOvlps]
+		self.confOvlps = [[contsA[i],contsB[j]] for i, j in confOvlps]
+	def categories(self):
+		'''Returns self.uniqueA, self.uniqueB, self.compOvlps and self.confOvlps as indices into section1/section2
+		contours, to be passed to another MergeSection of the same sections as its categories kwarg.'''
+		positionsA = dict((id(cont), i) for i, cont in enumerate(self.section1.contours))
+		positionsB = dict((id(cont), j) for j, cont in enumerate(self.section2.contours))
+		return ([positionsA[id(cont)] for cont in self.uniqueA],
+			[positionsB[id(cont)] for cont in self.uniqueB],
+			[(positionsA[id(a)], positionsB[id(b)]) for a, b in self.compOvlps],
+			[(positionsA[id(a)], positionsB[id(b)]) for a, b in self.confOvlps])
+	def journal(self):
+		'''Returns categories, resolutions and file digests (see Section._digest) of this MergeSection for
+		MergeSet.save.'''
+		images = self.images
+		if images is not None and images is self.section1.image:
+			images = 'A'
+		elif images is not None and images is self.section2.image:
+			images = 'B'
+		return {'name':self.name,
+			'index':self.section1.index,
+			'counts':(len(self.section1.contours), len(self.section2.contours)),
+			'digests':(self.section1._digest, self.section2._digest, self.base._digest if self.base is not None else None),
+			'categories':self.categories(),
+			'attributes':_attributesRef(self.attributes, self.section1, self.section2),
+			'images':images,
+			'contours':_refs(self.contours, self.section1.contours, self.section2.contours)}
+	def restore(self, journal):
+		'''Restores resolutions from the output of self.journal().'''
+		self.attributes = _attributesDeref(journal['attributes'], self.section1, self.section2)
+		images = journal['images']
+		self.images = self.section1.image if images == 'A' else self.section2.image if images == 'B' else images
+		self.contours = _derefs(journal['contours'], self.section1.contours, self.section2.contours)
 	def isDone(self):
 		'''Boolean indicating status of merge.'''
 		return (self.attributes is not None and
@@ -119,49 +501,21 @@ class MergeSection:
 	# mergeTool functions
 	def getCategorizedContours(self, threshold=(1+2**(-17)), sameName=True, overlaps=False):
 		'''Returns lists of mutually overlapping contours between two Section objects.'''
-		compOvlps = [] # Pairs of completely (within threshold) overlapping contours 
-		confOvlps = [] # Pairs of incompletely overlapping contours
-
-		# Compute overlaps
-		OvlpsA = [] # Section1 contours that have ovlps in section2
-		OvlpsB = [] # Section2 contours that have ovlps in section1
-		for contA in self.section1.contours:
-			ovlpA = []
-			ovlpB = []
-			for contB in self.section2.contours:
-				overlap = contA.overlaps(contB, threshold)
-				# If sameName: only check contours with the same name
-				if (sameName and
-					contA.name == contB.name and
-					overlap != 0):
-					ovlpA.append(contA)
-					ovlpB.append(contB)
-					if overlaps:
-						if overlap == 1:
-							compOvlps.append([contA,contB])
-						elif overlap > 0: # Conflicting (non-100%) overlap
-							confOvlps.append([contA,contB])
-				# If not sameName: check all contours, regardless of same name
-				elif not sameName and overlap != 0:
-					ovlpA.append(contA)
-					ovlpB.append(contB)
-					if overlaps:
-						if overlap:
-							compOvlps.append([contA,contB])
-						elif overlap > 0: # Conflicting (non-100%) overlap
-							confOvlps.append([contA,contB])
-			OvlpsA.extend(ovlpA)
-			OvlpsB.extend(ovlpB)
-
-		if overlaps:
-			# Return unique conts from section1, unique conts from section2, completely overlapping contours, and incompletely overlapping contours
-			return (
-				[cont for cont in self.section1.contours if cont not in OvlpsA],
-				[cont for cont in self.section2.contours if cont not in OvlpsB],
-				compOvlps, confOvlps )
-		else:
-			return ([cont for cont in self.section1.contours if cont not in OvlpsA],
-				[cont for cont in self.section2.contours if cont not in OvlpsB])
+		return categorizeContours(self.section1.contours, self.section2.contours, threshold, sameName, overlaps)
+	def free(self):
+		'''Releases the contours of both source sections (and of the base section of a three-way merge) and this
+		MergeSection's references to them (after the merged section is written). The source Series lose the contours
+		of this section.'''
+		self.section1.contours = []
+		self.section2.contours = []
+		if self.base is not None:
+			self.base.contours = []
+		self.uniqueA = []
+		self.uniqueB = []
+		self.compOvlps = []
+		self.confOvlps = []
+		if self.contours is not None:
+			self.contours = []
 	def toSection(self):
 		'''Returns a section object from self.attributes, self.images, and self.contours. Defaults any of these items to the self.section1 version if they are None (not resolved).'''
 		return Section(
@@ -182,6 +536,7 @@ class MergeSeries:
 		self.zcontours = None
 
 		# Process arguments
+		self.base = kwargs.pop('base', None) # Series both series derive from, for a three-way merge
 		self.processArguments(args, kwargs)
 		self.checkConflicts()
 
@@ -200,7 +555,12 @@ class MergeSeries:
 		for kwarg in kwargs:
 			print kwarg+':',kwargs[kwarg]
 	def checkConflicts(self):
-		'''Automatically set merged stuff for equivalent things.'''
+		'''Automatically set merged stuff for equivalent things (or things changed on only one side since self.base).'''
+		if self.base is not None:
+			self.attributes = threeWay(self.series1.attributes(), self.base.attributes(), self.series2.attributes())
+			self.contours = threeWay(self.series1.contours, self.base.contours, self.series2.contours)
+			self.zcontours = threeWay(self.series1.zcontours, self.base.zcontours, self.series2.zcontours)
+			return
 		# Are attributes equivalent?
 		if self.series1.attributes() == self.series2.attributes():
 			self.attributes = self.series1.attributes()
@@ -210,6 +570,17 @@ class MergeSeries:
 		# Are zcontours equivalent?
 		if self.series1.zcontours == self.series2.zcontours:
 			self.zcontours = self.series1.zcontours
+	def journal(self):
+		'''Returns resolutions and file digests (see Series._digest) of this MergeSeries for MergeSet.save.'''
+		return {'digests':(self.series1._digest, self.series2._digest, self.base._digest if self.base is not None else None),
+			'attributes':_attributesRef(self.attributes, self.series1, self.series2),
+			'contours':_refs(self.contours, self.series1.contours, self.series2.contours),
+			'zcontours':_refs(self.zcontours, self.series1.zcontours, self.series2.zcontours)}
+	def restore(self, journal):
+		'''Restores resolutions from the output of self.journal().'''
+		self.attributes = _attributesDeref(journal['attributes'], self.series1, self.series2)
+		self.contours = _derefs(journal['contours'], self.series1.contours, self.series2.contours)
+		self.zcontours = _derefs(journal['zcontours'], self.series1.zcontours, self.series2.zcontours)
 	def isDone(self):
 		'''Boolean indicating status of merge.'''
 		return (self.attributes is not None and
@@ -0,0 +1,205 @@
+'''Sidecar cache of parsed Section files, so unchanged sections can be reloaded without parsing XML.
+
+Each section file <dir>/<series>.<index> has an entry <dir>/.pyrecon/<series>/<series>.<index>.npz holding the
+section attributes, transforms, image metadata, and the contour names, flags and points as numpy arrays. An entry is
+used when the section file's mtime and size match, or when its content hash (sha1) matches.'''
+from pyrecon.classes import Contour, Image
+import numpy as np
+import hashlib, os, re
+
+def cacheDirectory(seriesPath):
+    '''Returns the default cache directory for the .ser file at <seriesPath>. (It must not contain '.ser', which
+    openSeries looks for when given a directory.)'''
+    directory, ser = os.path.split(seriesPath)
+    return os.path.join(directory, '.pyrecon', re.sub(re.escape('.ser')+'$', '', ser, flags=re.I), '')
+def fileDigest(path):
+    '''Returns the sha1 hex digest of the contents of the file at <path>.'''
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1<<20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+def entryPath(path, directory):
+    '''Returns the path of the cache entry for the section file at <path>.'''
+    if directory[-1] != '/':
+        directory += '/'
+    return directory+os.path.basename(path)+'.npz'
+
+# Reading
+def processSection(path, directory, names=None, arrays=False, transforms=None):
+    '''Returns attribute dictionary, image object, and contour list of the Section XML file at <path> (as
+    handleXML.process does), from its cache entry in <directory> if it is up to date. Otherwise the file is parsed
+    and its entry (re)written. The attributes also hold the sha1 of the file under 'digest'. Transforms are taken from the <transforms> table if given (see
+    handleXML.internTransform).'''
+    import pyrecon.tools.handleXML as xml
+    stat = os.stat(path)
+    entry = entryPath(path, directory)
+    section = None
+    digest = None
+    if os.path.exists(entry):
+        try:
+            with np.load(entry) as data:
+                if int(data['size']) == stat.st_size:
+                    if float(data['mtime']) == stat.st_mtime:
+                        section = fromArrays(data, transforms)
+                        section[0]['digest'] = str(data['digest'])
+                        return filterSection(section, names, arrays)
+                    digest = fileDigest(path)
+                    if str(data['digest']) == digest: # Same content, new mtime
+                        section = fromArrays(data, transforms)
+        except Exception as e:
+            print('Could not read cache entry %s (%s); parsing %s'%(entry, e, path))
+    if section is None: # Parse full section
+        section = xml.processSectionStream(path, transforms=transforms)
+    digest = digest or fileDigest(path)
+    try:
+        write(section, entry, stat, digest)
+    except Exception as e:
+        print('Could not write cache entry %s (%s)'%(entry, e))
+    section[0]['digest'] = digest
+    return filterSection(section, names, arrays)
+def filterSection(section, names=None, arrays=False):
+    '''Applies the <names> (regex) and <arrays> options of handleXML.process to a parsed section tuple.'''
+    attributes, image, contours = section
+    if contours is not None and names is not None:
+        if isinstance(names, basestring):
+            names = re.compile(names)
+        contours = [cont for cont in contours if cont.name == 'domain1' or names.match(cont.name)] or None
+    for contour in contours or []:
+        if arrays:
+            contour.points = contour.pointsArray()
+        else:
+            contour.points = contour.pointsList()
+    return attributes, image, contours
+def fromArrays(data, transforms=None):
+    '''Returns attribute dictionary, image object, and contour list from the arrays of a cache entry, taking
+    Transforms from the <transforms> table if given.'''
+    import pyrecon.tools.handleXML as xml
+    def coef(value):
+        '''Returns number from its repr, keeping ints as ints (see handleXML.transformAttributes).'''
+        return int(value) if value.lstrip('-').isdigit() else float(value)
+    attributes = {'index':int(data['index']),
+                  'thickness':float(data['thickness']),
+                  'alignLocked':bool(data['alignLocked'])}
+    # Transforms
+    tforms = []
+    for dim, xcoef, ycoef in zip(data['tDim'].tolist(), data['tXcoef'].tolist(), data['tYcoef'].tolist()):
+        tforms.append(xml.internTransform({'dim':dim,
+                                           'xcoef':[coef(x) for x in xcoef.split()],
+                                           'ycoef':[coef(y) for y in ycoef.split()]}, transforms))
+    # Image
+    image = None
+    if bool(data['hasImage']):
+        mag, contrast, brightness = data['imageValues'].tolist()
+        red, green, blue = data['imageFlags'].tolist()
+        image = Image({'src':str(data['imageSrc']),
+                       'mag':mag,
+                       'contrast':contrast,
+                       'brightness':brightness,
+                       'red':bool(red),
+                       'green':bool(green),
+                       'blue':bool(blue)},
+                      tforms[int(data['imageTransform'])])
+    # Contours
+    contours = None
+    points = data['points']
+    offsets = data['cOffsets'].tolist()
+    borders = data['cBorder'].tolist()
+    fills = data['cFill'].tolist()
+    modes = data['cMode'].tolist()
+    flags = data['cFlags'].tolist()
+    cTransform = data['cTransform'].tolist()
+    comments = data['cComment'].tolist()
+    for i, name in enumerate(data['cName'].tolist()):
+        cont = Contour({'name':name,
+                        'comment':comments[i],
+                        'hidden':bool(flags[i][0]),
+                        'closed':bool(flags[i][1]),
+                        'simplified':bool(flags[i][2]),
+                        'mode':modes[i],
+                        'border':tuple(borders[i]),
+                        'fill':tuple(fills[i]),
+                        'points':points[offsets[i]:offsets[i+1]],
+                        'coordSys':'bio'},
+                       tforms[cTransform[i]])
+        cont.section = attributes['index']
+        if name == 'domain1':
+            cont.image = image
+        if contours == None:
+            contours = []
+        contours.append(cont)
+    return attributes, image, contours
+
+# Writing
+def atomicWrite(path, writer):
+    '''Calls <writer>(f) with a binary file f that replaces the file at <path> once written, so that readers never
+    see a partly written file (also used for the mergeTool and curationTool journals).'''
+    tmp = '%s.%d.tmp'%(path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            writer(f)
+        if os.path.exists(path): # os.rename does not replace files on Windows
+            os.remove(path)
+        os.rename(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+def write(section, entry, stat, digest):
+    '''Writes the parsed <section> tuple to the cache entry at <entry>, keyed by <stat> and <digest> of its file.'''
+    attributes, image, contours = section
+    contours = contours or []
+    # Transforms, numbered in order of first use
+    transforms = []
+    def tformIndex(tform):
+        for i, t in enumerate(transforms):
+            if t is tform:
+                return i
+        transforms.append(tform)
+        return len(transforms)-1
+    imageTransform = tformIndex(image.transform) if image is not None else -1
+    cTransform = [tformIndex(cont.transform) for cont in contours]
+    for cont in contours:
+        if len(cont.border) != 3 or len(cont.fill) != 3:
+            raise ValueError('Contour %s does not have 3-value border/fill'%cont.name)
+    pointArrays = [cont.pointsArray() for cont in contours]
+    arrays = {
+        'mtime':np.float64(stat.st_mtime),
+        'size':np.int64(stat.st_size),
+        'digest':np.array(digest),
+        # Section attributes
+        'index':np.int64(attributes['index']),
+        'thickness':np.float64(attributes['thickness']),
+        'alignLocked':np.bool_(attributes['alignLocked']),
+        # Transforms
+        'tDim':np.array([t.dim for t in transforms], dtype=np.int64),
+        'tXcoef':np.array([' '.join(repr(x) for x in t.xcoef) for t in transforms], dtype=np.str_),
+        'tYcoef':np.array([' '.join(repr(y) for y in t.ycoef) for t in transforms], dtype=np.str_),
+        # Image
+        'hasImage':np.bool_(image is not None),
+        'imageSrc':np.array(image.src if image is not None else ''),
+        'imageValues':np.array([image.mag, image.contrast, image.brightness] if image is not None else [0,0,0],
+                               dtype=np.float64),
+        'imageFlags':np.array([image.red, image.green, image.blue] if image is not None else [0,0,0],
+                              dtype=np.bool_),
+        'imageTransform':np.int64(imageTransform),
+        # Contours
+        'cName':np.array([cont.name for cont in contours], dtype=np.str_),
+        'cComment':np.array([cont.comment for cont in contours], dtype=np.str_),
+        'cFlags':np.array([(cont.hidden, cont.closed, cont.simplified) for cont in contours],
+                          dtype=np.bool_).reshape((-1, 3)),
+        'cMode':np.array([cont.mode for cont in contours], dtype=np.int64),
+        'cBorder':np.array([cont.border for cont in contours], dtype=np.float64).reshape((-1, 3)),
+        'cFill':np.array([cont.fill for cont in contours], dtype=np.float64).reshape((-1, 3)),
+        'cTransform':np.array(cTransform, dtype=np.int64),
+        'cOffsets':np.cumsum([0]+[len(pts) for pts in pointArrays]).astype(np.int64),
+        'points':(np.concatenate(pointArrays) if pointArrays else np.zeros((0, 2))).astype(np.float64),
+    }
+    directory = os.path.dirname(entry)
+    if not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+            with open(os.path.join(directory, '.gitignore'), 'w') as f: # Keep cache out of series repositories
+                f.write('*\n')
+        except OSError: # Made by another process
+            pass
+    atomicWrite(entry, lambda f: np.savez(f, **arrays))
@@ -0,0 +1,28 @@
+'''Runs a function over many items in a pool of worker processes that get the data they share when they are forked
+(the sections of a Series in mergeTool and curationTool), so that only the items and the results are pickled.'''
+import multiprocessing
+
+_job = None # (function, data) of the imap being run, in a worker process
+def _initWorker(function, data):
+    global _job
+    _job = (function, data)
+def _call(item):
+    function, data = _job
+    return function(data, item)
+def imap(function, data, items, workers=None):
+    '''Yields <function>(<data>, item) for each of <items>, in order, computed in a pool of <workers> processes
+    (default: CPU count). With one worker or fewer than two items, they are computed in this process.'''
+    items = list(items)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield function(data, item)
+        return
+    pool = multiprocessing.Pool(min(workers, len(items)), _initWorker, (function, data))
+    try:
+        for result in pool.imap(_call, items, chunksize=max(1, len(items)//(workers*8))):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,63 @@
+'''Writes small RECONSTRUCT series directories for the tests.'''
+import os
+
+SERIES_ATTRIBUTES = [('index', '0'), ('viewport', '0 0 0.00254'), ('units', 'microns'), ('autoSaveSeries', 'true'),
+    ('autoSaveSection', 'true'), ('warnSaveSection', 'true'), ('beepDeleting', 'true'), ('beepPaging', 'true'),
+    ('hideTraces', 'false'), ('unhideTraces', 'false'), ('hideDomains', 'false'), ('unhideDomains', 'false'),
+    ('useAbsolutePaths', 'false'), ('defaultThickness', '0.05'), ('zMidSection', 'false'), ('thumbWidth', '128'),
+    ('thumbHeight', '96'), ('fitThumbSections', 'false'), ('firstThumbSection', '1'),
+    ('lastThumbSection', '2147483647'), ('skipSections', '1'), ('displayThumbContours', 'true'),
+    ('useFlipbookStyle', 'false'), ('flipRate', '5'), ('useProxies', 'true'), ('widthUseProxies', '2048'),
+    ('heightUseProxies', '1536'), ('scaleProxies', '0.25'), ('significantDigits', '6'),
+    ('defaultBorder', '1.000 0.000 1.000'), ('defaultFill', '1.000 0.000 1.000'), ('defaultMode', '9'),
+    ('defaultName', 'domain$+'), ('defaultComment', ''), ('listSectionThickness', 'true'),
+    ('listDomainSource', 'true'), ('listDomainPixelsize', 'true'), ('listDomainLength', 'false'),
+    ('listDomainArea', 'false'), ('listDomainMidpoint', 'false'), ('listTraceComment', 'true'),
+    ('listTraceLength', 'false'), ('listTraceArea', 'true'), ('listTraceCentroid', 'false'),
+    ('listTraceExtent', 'false'), ('listTraceZ', 'false'), ('listTraceThickness', 'false'),
+    ('listObjectRange', 'true'), ('listObjectCount', 'true'), ('listObjectSurfarea', 'false'),
+    ('listObjectFlatarea', 'false'), ('listObjectVolume', 'false'), ('listZTraceNote', 'true'),
+    ('listZTraceRange', 'true'), ('listZTraceLength', 'true'), ('borderColors', '0.000 0.000 0.000,'),
+    ('fillColors', '0.000 0.000 0.000,'), ('offset3D', '0 0 0'), ('type3Dobject', '0'), ('first3Dsection', '1'),
+    ('last3Dsection', '2147483647'), ('max3Dconnection', '-1'), ('upper3Dfaces', 'true'),
+    ('lower3Dfaces', 'true'), ('faceNormals', 'false'), ('vertexNormals', 'true'), ('facets3D', '8'),
+    ('dim3D', '-1 -1 -1'), ('gridType', '0'), ('gridSize', '1 1'), ('gridDistance', '1 1'), ('gridNumber', '1 1'),
+    ('hueStopWhen', '3'), ('hueStopValue', '50'), ('satStopWhen', '3'), ('satStopValue', '50'),
+    ('brightStopWhen', '0'), ('brightStopValue', '100'), ('tracesStopWhen', 'false'), ('areaStopPercent', '999'),
+    ('areaStopSize', '0'), ('ContourMaskWidth', '0'), ('smoothingLength', '7'),
+    ('mvmtIncrement', '0.022 1 1 1.01 1.01 0.02 0.02 0.001 0.001'),
+    ('ctrlIncrement', '0.0044 0.01 0.01 1.002 1.002 0.004 0.004 0.0002 0.0002'),
+    ('shiftIncrement', '0.11 100 100 1.05 1.05 0.1 0.1 0.005 0.005')]
+
+def square(x, y, size):
+    '''Returns the corners of a square trace.'''
+    return [(x, y), (x+size, y), (x+size, y+size), (x, y+size)]
+def contourElement(name, points):
+    '''Returns the XML of a closed section contour named <name>, or with a literal <points> attribute if a string.'''
+    if not isinstance(points, basestring):
+        points = ', '.join('%r %r'%point for point in points)+','
+    return ('<Contour name="%s" hidden="false" closed="true" simplified="true" border="1 0 0" fill="1 0 0" '
+            'mode="9"\n points="%s"/>\n'%(name, points))
+def writeSection(directory, index, contours, name='test'):
+    '''Writes section <index> with <contours> (name -> points, or a list of (name, points)) to <directory>.'''
+    if isinstance(contours, dict):
+        contours = sorted(contours.items())
+    with open(os.path.join(directory, '%s.%d'%(name, index)), 'w') as f:
+        f.write('<?xml version="1.0"?>\n<Section index="%d" thickness="0.05" alignLocked="true">\n'%index)
+        f.write('<Transform dim="0" xcoef=" 0 1 0 0 0 0" ycoef=" 0 0 1 0 0 0">\n')
+        f.write('<Image mag="0.00254" contrast="1" brightness="0" red="true" green="true" blue="true" '
+                'src="image%d.tif" />\n'%index)
+        f.write(contourElement('domain1', square(0, 0, 4096)))
+        f.write('</Transform>\n<Transform dim="0" xcoef=" 0 1 0 0 0 0" ycoef=" 0 0 1 0 0 0">\n')
+        for contourName, points in contours:
+            f.write(contourElement(contourName, points))
+        f.write('</Transform>\n</Section>\n')
+def writeSeries(directory, sections, name='test'):
+    '''Writes a series to <directory>: a .ser file and one section file per item of <sections> (see writeSection).'''
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(os.path.join(directory, name+'.ser'), 'w') as f:
+        f.write('<?xml version="1.0"?>\n<Series %s>\n</Series>\n'%
+                ' '.join('%s="%s"'%attribute for attribute in SERIES_ATTRIBUTES))
+    for index, contours in enumerate(sections):
+        writeSection(directory, index, contours, name)
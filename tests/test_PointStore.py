@@ -0,0 +1,28 @@
+import shutil, tempfile, unittest
+import numpy as np
+from pyrecon.main import openSeries
+from seriesFiles import square, writeSeries
+
+class PointStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        triangle = [(0, 0), (1, 0), (9, 9)]
+        writeSeries(self.directory, [[('a', triangle), ('empty', ''), ('b', square(3, 1, 2))],
+                                     [('b', square(1, 1, 1)), ('a', triangle), ('empty', ''), ('empty', '')]])
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testMeasurements(self):
+        '''Whole-series measurements match those of each Contour, with contours without points (also last) at 0/nan.'''
+        store = openSeries(self.directory, workers=1, arrays=True).pointStore()
+        bounds, areas, lengths = store.bounds(), store.areas(), store.lengths()
+        for c, contour in enumerate(store.contours):
+            if len(contour.points) == 0:
+                self.assertTrue(np.isnan(bounds[c]).all())
+                self.assertEqual((areas[c], lengths[c]), (0, 0))
+            else:
+                self.assertTrue(np.allclose(bounds[c], contour.bounds()))
+                self.assertAlmostEqual(areas[c], contour.getArea())
+                self.assertAlmostEqual(lengths[c], contour.getLength())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import shutil, tempfile, unittest
+from pyrecon.main import openSeries
+from pyrecon.classes import Section
+from seriesFiles import square, writeSeries
+
+class SectionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        writeSeries(self.directory, [{'a':square(1, 1, 1), 'b':square(3, 1, 1)}])
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testFromContours(self):
+        '''A Section made from another's contours (as MergeSection.toSection does) holds them all.'''
+        section = openSeries(self.directory, workers=1).sections[0]
+        copy = Section(section.attributes(), section.image, section.contours)
+        self.assertEqual([contour.name for contour in copy.contours], [contour.name for contour in section.contours])
+        copy = Section({'contours':section.contours})
+        self.assertEqual(len(copy.contours), len(section.contours))
+    def testContourListVersion(self):
+        section = openSeries(self.directory, workers=1).sections[0]
+        versions = [section.contours.version]
+        section.contours.append(section.contours[0])
+        versions.append(section.contours.version)
+        section.contours[0] = section.contours[1]
+        versions.append(section.contours.version)
+        del section.contours[0]
+        versions.append(section.contours.version)
+        section.contours = []
+        versions.append(section.contours.version)
+        self.assertEqual(len(set(versions)), len(versions))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import gc, os, shutil, tempfile, unittest
+from pyrecon.main import openSeries
+from pyrecon.classes import Contour
+from pyrecon.tools import handleXML as xml
+from seriesFiles import square, writeSeries
+
+class NameIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        writeSeries(self.directory, [[('a', square(1, 1, 1)), ('b', square(3, 1, 1)), ('a', square(5, 1, 1))]
+                                     for i in range(4)])
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def assertIndexed(self, series):
+        '''Index lookups must give what a scan of the sections gives.'''
+        for name in ['a', 'b', 'c', 'domain1']:
+            scanned = [(section, contour) for section in series.sections for contour in section.contours
+                       if contour.name == name]
+            found = series.occurrences(name)
+            self.assertEqual(len(found), len(scanned))
+            for (section1, contour1), (section2, contour2) in zip(found, scanned):
+                self.assertTrue(section1 is section2)
+                self.assertEqual(contour1.geometryKey(), contour2.geometryKey())
+        names = sorted(set(contour.name for section in series.sections for contour in section.contours))
+        self.assertEqual(series.nameIndex().names, names)
+    def testContourChanges(self):
+        series = openSeries(self.directory, workers=1)
+        self.assertIndexed(series)
+        series.sections[0].contours.append(Contour({'name':'c', 'closed':True, 'points':square(7, 1, 1)}))
+        self.assertIndexed(series)
+        series.sections[1].contours.remove(series.sections[1].contours[1])
+        self.assertIndexed(series)
+        series.sections[2].contours[2].name = 'c'
+        self.assertIndexed(series)
+        series.sections[3].contours = []
+        self.assertIndexed(series)
+        series.sections.pop(0)
+        self.assertIndexed(series)
+    def testLazySeries(self):
+        gc.collect()
+        before = sum(isinstance(obj, Contour) for obj in gc.get_objects())
+        series = openSeries(self.directory, lazy=True, resident=1)
+        series.nameIndex()
+        gc.collect()
+        resident = len(series.sections[-1].contours) # Only the last section read stays in memory
+        self.assertEqual(sum(isinstance(obj, Contour) for obj in gc.get_objects())-before,
+                         resident+len(series.contours))
+        self.assertIndexed(series) # Sections are re-read as they are resolved
+    def testLazyEdits(self):
+        '''Sections changed in a lazy Series stay in memory when evicted, and are written like any other.'''
+        series = openSeries(self.directory, lazy=True, resident=1)
+        series.sections[0].contours.pop()
+        series.sections[1].contours[0].border = (0, 0, 1)
+        for section in series.sections:
+            section.contours # Evicts the other sections
+        self.assertEqual(len(series.sections[0].contours), 3)
+        self.assertEqual(series.sections[1].contours[0].border, (0, 0, 1))
+        self.assertEqual(len(series.sections[2].contours), 4)
+        output = os.path.join(self.directory, 'out')
+        os.mkdir(output)
+        xml.writeSeries(series, output, sections=True)
+        written = openSeries(output, workers=1)
+        self.assertEqual([len(section.contours) for section in written.sections], [3, 4, 4, 4])
+        self.assertEqual(written.sections[1].contours[0].border, series.sections[1].contours[0].border)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os, shutil, tempfile, unittest
+from pyrecon.main import openSeries
+from pyrecon.tools.curationTool.curationTool import DuplicateCheck, curate
+from seriesFiles import square, writeSection, writeSeries
+
+class CurateJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = os.path.join(self.directory, 'curation.journal')
+        duplicated = [('a', square(1, 1, 1)), ('a', square(1, 1, 1))]
+        writeSeries(self.directory, [duplicated, duplicated, [('a', square(1, 1, 1)), ('a', square(5, 1, 1))]])
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def duplicates(self, series):
+        found = curate(series, {'duplicates':DuplicateCheck()}, workers=1, journal=self.journal)['duplicates']
+        return sorted(found)
+    def testChangedSections(self):
+        '''Sections changed on disk or in memory since the journal was saved are checked again.'''
+        series = openSeries(self.directory, workers=1)
+        writeSection(self.directory, 0, [('a', square(1, 1, 1)), ('a', square(5, 1, 1))]) # Once loaded
+        self.assertEqual(self.duplicates(series), [0, 1])
+        series = openSeries(self.directory, workers=1)
+        self.assertEqual(self.duplicates(series), [1])
+        series.sections[1].contours.pop()
+        series.sections[2].contours[-1].points = square(1, 1, 1) # Geometry only
+        self.assertEqual(self.duplicates(series), [2])
+        self.assertEqual(self.duplicates(openSeries(self.directory, workers=1)), [1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os, shutil, tempfile, unittest
+from lxml import etree as ET
+from pyrecon.tools import handleXML as xml
+from seriesFiles import square, writeSection
+
+class PointsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testPointsArray(self):
+        self.assertEqual(xml.pointsArray('1 2, 3.5 4,').tolist(), [[1, 2], [3.5, 4]])
+        self.assertEqual(xml.pointsArray('').shape, (0, 2))
+        for points in ['1 2, 3 x4, 5 6,', '1 2, 3,', '1 2, 3 4 5 6 7,']:
+            self.assertRaises(xml.PointsError, xml.pointsArray, points)
+        self.assertRaises(xml.PointsError, xml.pointsArray, '1 2, 3.5 4,', int)
+    def testMalformedSectionFile(self):
+        '''A malformed points attribute must not load as the points before it.'''
+        writeSection(self.directory, 3, [('a', square(1, 1, 1)), ('b', '1 1, 2 1, 2 2;, 1 2,')])
+        path = os.path.join(self.directory, 'test.3')
+        for parse in [lambda: xml.processSectionStream(path), lambda: xml.processSectionFile(ET.parse(path))]:
+            try:
+                parse()
+            except xml.PointsError as e:
+                self.assertTrue('Section 3' in str(e) and 'Contour b' in str(e))
+            else:
+                self.fail('PointsError not raised')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import cPickle, os, shutil, tempfile, unittest
+from pyrecon.main import openSeries
+from pyrecon.tools.mergeTool.main import createMergeSet, loadMergeSet
+from seriesFiles import square, writeSection, writeSeries
+
+class CreateMergeSetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testSeriesOpenedFromOneDirectory(self):
+        '''As in gitTool's beginMergeTool: one series is opened, the other branch is checked out over the same
+        files, then the other series is opened from the same paths.'''
+        writeSeries(self.directory, [{'a':square(1, 1, 1), 'b':square(3, 1, 1)} for i in range(3)])
+        series2 = openSeries(self.directory, workers=1)
+        writeSection(self.directory, 1, {'a':square(1, 1, 1), 'b':square(3, 1.25, 1)}) # Same number of contours
+        writeSection(self.directory, 2, {'a':square(1, 1, 1), 'b':square(3, 1, 1), 'c':square(5, 1, 1)})
+        series1 = openSeries(self.directory, workers=1)
+        mergeSet = createMergeSet(series1, series2, workers=1)
+        expected = createMergeSet(series1, series2, workers=1, skipIdentical=False)
+        self.assertEqual([mergeSec.categories() for mergeSec in mergeSet.sectionMerges],
+                         [mergeSec.categories() for mergeSec in expected.sectionMerges])
+        self.assertTrue(mergeSet.sectionMerges[0].isDone())
+        self.assertEqual(len(mergeSet.sectionMerges[1].confOvlps), 1) # Moved 'b'
+        self.assertEqual([contour.name for contour in mergeSet.sectionMerges[2].uniqueA], ['c'])
+    def testLazySeries(self):
+        writeSeries(self.directory, [{'a':square(1, 1, 1), 'b':square(3, 1, 1)} for i in range(3)])
+        series2 = openSeries(self.directory, workers=1)
+        writeSection(self.directory, 1, {'a':square(1, 1, 1), 'b':square(3, 1.25, 1)})
+        series1 = openSeries(self.directory, workers=1)
+        expected = createMergeSet(series1, series2, workers=1)
+        series1 = openSeries(self.directory, lazy=True, resident=1)
+        mergeSet = createMergeSet(series1, series2, workers=1)
+        self.assertEqual([mergeSec.categories() for mergeSec in mergeSet.sectionMerges],
+                         [mergeSec.categories() for mergeSec in expected.sectionMerges])
+    def testFreeReleasesBase(self):
+        writeSeries(self.directory, [{'a':square(1, 1, 1), 'b':square(3, 1, 1)} for i in range(2)])
+        base = openSeries(self.directory, workers=1)
+        series1 = openSeries(self.directory, workers=1)
+        series2 = openSeries(self.directory, workers=1)
+        series2.sections[0].contours.append(series2.sections[1].contours[1])
+        mergeSet = createMergeSet(series1, series2, workers=1, base=base)
+        mergeSec = mergeSet.sectionMerges[0]
+        self.assertTrue(mergeSec.isDone())
+        mergeSec.free()
+        for section in [series1.sections[0], series2.sections[0], base.sections[0]]:
+            self.assertEqual(len(section.contours), 0)
+        self.assertEqual(len(base.sections[1].contours), 3)
+    def testThreeWayAttributes(self):
+        '''Attributes changed on one side only are taken from that side; changed on both sides, they conflict.'''
+        writeSeries(self.directory, [{'a':square(1, 1, 1), 'b':square(3, 1, 1)} for i in range(2)])
+        base, series1, series2 = [openSeries(self.directory, workers=1) for i in range(3)]
+        a1, b1 = [contour for contour in series1.sections[0].contours if contour.name in 'ab']
+        a2, b2 = [contour for contour in series2.sections[0].contours if contour.name in 'ab']
+        a2.border = (0, 0, 1)
+        b1.comment = 'edited'
+        [contour for contour in series1.sections[1].contours if contour.name == 'a'][0].border = (0, 1, 0)
+        [contour for contour in series2.sections[1].contours if contour.name == 'a'][0].border = (0, 0, 1)
+        mergeSet = createMergeSet(series1, series2, workers=1, base=base)
+        mergeSec = mergeSet.sectionMerges[0]
+        self.assertTrue(mergeSec.isDone())
+        merged = [id(contour) for contour in mergeSec.contours]
+        self.assertTrue(id(a2) in merged and id(a1) not in merged)
+        self.assertTrue(id(b1) in merged and id(b2) not in merged)
+        self.assertFalse(mergeSet.sectionMerges[1].isDone())
+        self.assertEqual([[contour.name for contour in pair] for pair in mergeSet.sectionMerges[1].confOvlps],
+                         [['a', 'a']])
+
+class WriteMergeSetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'out')
+        for branch in ['one', 'two']:
+            writeSeries(os.path.join(self.directory, branch), [{'a':square(1, 1, 1), 'b':square(3, 1, 1)}
+                                                               for i in range(3)])
+        writeSection(os.path.join(self.directory, 'two'), 1, {'a':square(1, 1, 1), 'b':square(3, 1.25, 1)})
+        os.mkdir(self.output)
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def mergeSet(self):
+        series1 = openSeries(os.path.join(self.directory, 'one'), workers=1)
+        series2 = openSeries(os.path.join(self.directory, 'two'), workers=1)
+        return createMergeSet(series1, series2, workers=1)
+    def contents(self, section):
+        return [(contour.name, contour.points) for contour in section.contours]
+    def testExistingFile(self):
+        '''A section whose file exists is neither marked written nor freed unless it is overwritten.'''
+        writeSection(self.output, 0, {'c':square(5, 1, 1)})
+        mergeSet = self.mergeSet()
+        self.assertEqual(mergeSet.writeDoneSections(self.output), 1) # Section 1 has a conflict
+        self.assertFalse(mergeSet.sectionMerges[0].written)
+        self.assertTrue(mergeSet.sectionMerges[0].section1.contours)
+        with open(os.path.join(self.output, 'test.0')) as sectionFile:
+            text = sectionFile.read()
+        self.assertTrue('name="c"' in text and 'name="a"' not in text) # The old file is kept
+        self.assertEqual(mergeSet.writeDoneSections(self.output, overwrite=True), 1)
+        self.assertTrue(mergeSet.sectionMerges[0].written)
+    def testStreamMergeSet(self):
+        mergeSet = self.mergeSet()
+        expected = [self.contents(mergeSec.toSection()) for mergeSec in mergeSet.sectionMerges]
+        mergeSet.streamMergeSet(self.output)
+        merged = openSeries(self.output, workers=1)
+        self.assertEqual([self.contents(section) for section in merged.sections], expected)
+        for mergeSec in mergeSet.sectionMerges:
+            self.assertTrue(mergeSec.written)
+            self.assertEqual(len(mergeSec.section1.contours), 0)
+    def testStreamOverLeftoverSection(self):
+        '''Without the series file (whose overwrite writeSeries confirms), leftover sections are not replaced.'''
+        writeSection(self.output, 2, {'c':square(5, 1, 1)})
+        mergeSet = self.mergeSet()
+        expected = self.contents(mergeSet.sectionMerges[2].toSection())
+        self.assertRaises(IOError, mergeSet.streamMergeSet, self.output)
+        self.assertEqual(os.listdir(self.output), ['test.2'])
+        self.assertTrue(mergeSet.sectionMerges[2].section1.contours)
+        mergeSet.streamMergeSet(self.output, overwrite=True)
+        self.assertEqual(self.contents(openSeries(self.output, workers=1).sections[2]), expected)
+
+class MergeJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = os.path.join(self.directory, 'merge.journal')
+        for branch in ['one', 'two']:
+            writeSeries(os.path.join(self.directory, branch), [{'a':square(1, 1, 1), 'b':square(3, 1, 1)}
+                                                               for i in range(3)])
+        writeSection(os.path.join(self.directory, 'two'), 1, {'a':square(1, 1, 1), 'b':square(3, 1.25, 1)})
+        writeSection(os.path.join(self.directory, 'two'), 2, {'a':square(1, 1, 1), 'b':square(3, 1.5, 1)})
+        series1 = openSeries(os.path.join(self.directory, 'one'), workers=1)
+        series2 = openSeries(os.path.join(self.directory, 'two'), workers=1)
+        mergeSet = createMergeSet(series1, series2, workers=1)
+        for mergeSec in mergeSet.sectionMerges:
+            mergeSec.contours = [contour for contour in mergeSec.section2.contours if contour.name != 'a']
+        mergeSet.save(self.journal)
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def resolutions(self, mergeSet):
+        return [[contour.name for contour in mergeSec.contours] if mergeSec.contours is not None else None
+                for mergeSec in mergeSet.sectionMerges]
+    def testUnchanged(self):
+        mergeSet = loadMergeSet(self.journal, workers=1)
+        self.assertEqual(self.resolutions(mergeSet), [['domain1', 'b']]*3)
+    def testChangedSection(self):
+        '''Only the section whose file changed is categorized again, without its resolutions.'''
+        writeSection(os.path.join(self.directory, 'two'), 2, {'a':square(1, 1, 1), 'b':square(3, 1.75, 1)})
+        mergeSet = loadMergeSet(self.journal, workers=1)
+        self.assertEqual(self.resolutions(mergeSet), [['domain1', 'b'], ['domain1', 'b'], None])
+        expected = createMergeSet(openSeries(os.path.join(self.directory, 'one'), workers=1),
+                                  openSeries(os.path.join(self.directory, 'two'), workers=1), workers=1)
+        self.assertEqual([mergeSec.categories() for mergeSec in mergeSet.sectionMerges],
+                         [mergeSec.categories() for mergeSec in expected.sectionMerges])
+    def testOtherVersion(self):
+        with open(self.journal, 'wb') as f:
+            cPickle.dump({'version':1, 'sections':{}}, f)
+        self.assertRaises(ValueError, loadMergeSet, self.journal, workers=1)
+
+if __name__ == '__main__':
+    unittest.main()